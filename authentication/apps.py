@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class AuthenticationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
+
+    def ready(self):
+        from .registration import preload, registration_settings
+        from .revocation import check_revocation_backend
+
+        check_revocation_backend()
+        if registration_settings()['PRELOAD']:
+            preload()
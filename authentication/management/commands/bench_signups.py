@@ -0,0 +1,61 @@
+import secrets
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections
+from authentication.registration import register_user
+from authentication.serializers import UserRegistrationSerializer
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark a burst of concurrent signups through the registration pipeline.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark users instead of deleting them.')
+
+    def handle(self, *args, **options):
+        prefix = f'bench_{secrets.token_hex(3)}_'
+
+        def signup(n):
+            try:
+                username = f'{prefix}{n}'
+                serializer = UserRegistrationSerializer(data={
+                    'username': username,
+                    'email': f'{username}@example.com',
+                    'password': 'correct-horse-battery',
+                    'password_confirm': 'correct-horse-battery',
+                })
+                started = time.perf_counter()
+                _, _, timings = register_user(serializer)
+                return (time.perf_counter() - started) * 1000, timings.stages
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(signup, range(options['count'])))
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency for latency, _ in results]
+        self.stdout.write(
+            f"{options['count']} signups with concurrency {options['concurrency']} in {elapsed:.2f}s "
+            f"({options['count'] / elapsed:.1f}/s); latency p50 {percentile(latencies, 0.5):.0f} ms, "
+            f"p95 {percentile(latencies, 0.95):.0f} ms"
+        )
+        for stage in results[0][1]:
+            durations = [stages[stage] for _, stages in results]
+            self.stdout.write(
+                f'  {stage:<20} mean {statistics.mean(durations):7.1f} ms  p95 {percentile(durations, 0.95):7.1f} ms'
+            )
+
+        if not options['keep']:
+            User.objects.filter(username__startswith=prefix).delete()
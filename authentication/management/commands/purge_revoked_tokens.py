@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from authentication.revocation import get_revocation_store
+
+
+class Command(BaseCommand):
+    help = 'Drop expired entries from the refresh-token revocation set and rebuild the bloom filter.'
+
+    def handle(self, *args, **options):
+        removed = get_revocation_store().purge()
+        self.stdout.write(self.style.SUCCESS(f'Purged {removed} expired revocations'))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevocationSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(max_length=255, unique=True)),
+                ('expires_at', models.FloatField(db_index=True)),
+                ('seq', models.BigIntegerField(unique=True)),
+            ],
+            options={
+                'verbose_name': 'Revoked token',
+                'verbose_name_plural': 'Revoked tokens',
+            },
+        ),
+    ]
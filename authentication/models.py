@@ -0,0 +1,22 @@
+from django.db import models
+
+
+class RevokedToken(models.Model):
+    """A revoked refresh-token id, kept until the token would have expired."""
+
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.FloatField(db_index=True)
+    seq = models.BigIntegerField(unique=True)
+
+    class Meta:
+        verbose_name = 'Revoked token'
+        verbose_name_plural = 'Revoked tokens'
+
+    def __str__(self):
+        return self.jti
+
+
+class RevocationSequence(models.Model):
+    """Single-row counter that orders ``RevokedToken.seq`` in commit order."""
+
+    value = models.BigIntegerField(default=0)
@@ -0,0 +1,109 @@
+"""Staged account registration.
+
+``register_user`` runs a validated registration in stages: serializer
+validation (including the username uniqueness query), the
+``AUTH_PASSWORD_VALIDATORS``, password hashing, the insert and token minting.
+Hashing is the expensive stage and only runs once the validators accept the
+password, so rejected signups cost no PBKDF2. It runs on a bounded thread
+pool (``REGISTRATION['HASH_WORKERS']``, one per CPU by default): a burst of
+signups queues for the pool rather than running more hashes at once than
+there are CPUs, while the request threads wait for their result.
+``preload`` warms the validator list (``CommonPasswordValidator`` reads a
+20k-entry file) and the hasher when the app starts. Each stage is timed,
+traced as ``registration.<stage>`` and reported through ``Server-Timing``.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.password_validation import get_default_password_validators, validate_password
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+from rental_backend.tracing import span
+from .tokens import RevocableRefreshToken
+
+DEFAULTS = {
+    'PRELOAD': True,
+    'HASH_WORKERS': None,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def registration_settings():
+    return {**DEFAULTS, **getattr(settings, 'REGISTRATION', {})}
+
+
+def preload():
+    get_default_password_validators()
+    get_hasher()
+
+
+def hash_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = registration_settings()['HASH_WORKERS'] or os.cpu_count() or 1
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        return _executor
+
+
+class StageTimings:
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        with span(f'registration.{name}'):
+            try:
+                yield
+            finally:
+                self.stages[name] = (time.perf_counter() - started) * 1000
+
+    def server_timing(self):
+        return ', '.join(f'{name};dur={duration:.1f}' for name, duration in self.stages.items())
+
+
+def register_user(serializer, timings=None):
+    """Create the user for a ``UserRegistrationSerializer`` and mint tokens.
+
+    Raises DRF ``ValidationError`` for invalid data, rejected passwords or a
+    username taken concurrently. Returns ``(user, refresh_token, timings)``.
+    """
+    timings = timings or StageTimings()
+    with timings.stage('validate'):
+        serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    user = User(
+        username=data['username'],
+        email=data.get('email', ''),
+        first_name=data.get('first_name', ''),
+        last_name=data.get('last_name', ''),
+    )
+
+    password = data['password']
+    with timings.stage('password_validators'):
+        try:
+            validate_password(password, user)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({'password': list(e.messages)})
+    with timings.stage('hash'):
+        user.password = hash_executor().submit(make_password, password).result()
+
+    with timings.stage('insert'):
+        try:
+            with transaction.atomic():
+                user.save()
+        except IntegrityError:
+            raise serializers.ValidationError({'username': ['A user with that username already exists.']})
+
+    with timings.stage('tokens'):
+        refresh = RevocableRefreshToken.for_user(user)
+    return user, refresh, timings
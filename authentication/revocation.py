@@ -0,0 +1,281 @@
+import hashlib
+import math
+import threading
+import time
+from bisect import bisect_right
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import router, transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+DEFAULTS = {
+    'BACKEND': 'authentication.revocation.DatabaseRevocationBackend',
+    'OPTIONS': {},
+    'BLOOM_CAPACITY': 100000,
+    'BLOOM_ERROR_RATE': 0.001,
+    'BLOOM_REBUILD_INTERVAL': 3600,
+    'SYNC_INTERVAL': 5,
+    'PURGE_INTERVAL': 600,
+}
+
+PROCESS_LOCAL_BACKENDS = ('authentication.revocation.InMemoryRevocationBackend',)
+
+
+def revocation_settings():
+    return {**DEFAULTS, **getattr(settings, 'TOKEN_REVOCATION', {})}
+
+
+def check_revocation_backend():
+    backend = revocation_settings()['BACKEND']
+    if backend in PROCESS_LOCAL_BACKENDS:
+        raise ImproperlyConfigured(
+            f"TOKEN_REVOCATION['BACKEND'] is {backend}, which is not shared between workers; "
+            "a token revoked on one worker would still be accepted by the others. "
+            "Use DatabaseRevocationBackend or RedisRevocationBackend."
+        )
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class InMemoryRevocationBackend:
+    """Process-local revocation set for unit tests; refused as the configured backend."""
+
+    def __init__(self, **options):
+        self._lock = threading.Lock()
+        self._expiry = {}
+        self._seqs = []
+        self._log = []
+        self._seq = 0
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._seq += 1
+            self._expiry[jti] = expires_at
+            self._seqs.append(self._seq)
+            self._log.append(jti)
+
+    def contains(self, jti, now):
+        expires_at = self._expiry.get(jti)
+        return expires_at is not None and expires_at > now
+
+    def added_since(self, cursor):
+        with self._lock:
+            index = bisect_right(self._seqs, cursor)
+            return self._log[index:], self._seq
+
+    def active(self, now):
+        with self._lock:
+            return [jti for jti, expires_at in self._expiry.items() if expires_at > now], self._seq
+
+    def purge(self, now):
+        with self._lock:
+            expired = {jti for jti, expires_at in self._expiry.items() if expires_at <= now}
+            for jti in expired:
+                del self._expiry[jti]
+            kept = [(seq, jti) for seq, jti in zip(self._seqs, self._log) if jti not in expired]
+            self._seqs = [seq for seq, _ in kept]
+            self._log = [jti for _, jti in kept]
+            return len(expired)
+
+
+class DatabaseRevocationBackend:
+    """Revocation set in the ``RevokedToken`` table of the default database.
+
+    ``add`` bumps ``RevocationSequence`` first; the UPDATE holds the counter
+    row lock until commit, so sequence numbers become visible to
+    ``added_since`` in the order they were handed out and no worker's cursor
+    can move past a revocation that has not committed yet.
+    """
+
+    def __init__(self, **options):
+        from .models import RevocationSequence, RevokedToken
+
+        self.sequence = RevocationSequence
+        self.tokens = RevokedToken
+
+    def _next_seq(self):
+        counter = self.sequence.objects.filter(pk=1)
+        if not counter.update(value=F('value') + 1):
+            self.sequence.objects.get_or_create(pk=1)
+            counter.update(value=F('value') + 1)
+        return counter.values_list('value', flat=True).get()
+
+    def add(self, jti, expires_at):
+        with transaction.atomic(using=router.db_for_write(self.tokens)):
+            seq = self._next_seq()
+            self.tokens.objects.update_or_create(jti=jti, defaults={'expires_at': expires_at, 'seq': seq})
+
+    def contains(self, jti, now):
+        return self.tokens.objects.filter(jti=jti, expires_at__gt=now).exists()
+
+    def added_since(self, cursor):
+        rows = list(self.tokens.objects.filter(seq__gt=cursor).order_by('seq').values_list('jti', 'seq'))
+        if not rows:
+            return [], cursor
+        return [jti for jti, _ in rows], rows[-1][1]
+
+    def active(self, now):
+        seq = self.sequence.objects.filter(pk=1).values_list('value', flat=True).first() or 0
+        return list(self.tokens.objects.filter(expires_at__gt=now).values_list('jti', flat=True)), seq
+
+    def purge(self, now):
+        removed, _ = self.tokens.objects.filter(expires_at__lte=now).delete()
+        return removed
+
+
+class RedisRevocationBackend:
+    """Revocation set kept in two Redis sorted sets: jti by expiry, and jti by insertion order."""
+
+    ADD_SCRIPT = """
+    local seq = redis.call('INCR', KEYS[3])
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+    redis.call('ZADD', KEYS[2], seq, ARGV[1])
+    return seq
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='jwt:revoked', **options):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.expiry_key = prefix
+        self.log_key = f'{prefix}:log'
+        self.seq_key = f'{prefix}:seq'
+        # INCR and both ZADDs in one script, so sequence numbers reach the log
+        # in order and added_since() never skips past a concurrent revocation.
+        self._add = self.client.register_script(self.ADD_SCRIPT)
+
+    def add(self, jti, expires_at):
+        self._add(keys=[self.expiry_key, self.log_key, self.seq_key], args=[jti, expires_at])
+
+    def contains(self, jti, now):
+        expires_at = self.client.zscore(self.expiry_key, jti)
+        return expires_at is not None and expires_at > now
+
+    def added_since(self, cursor):
+        entries = self.client.zrangebyscore(self.log_key, f'({cursor}', '+inf', withscores=True)
+        if not entries:
+            return [], cursor
+        return [jti.decode() for jti, _ in entries], int(entries[-1][1])
+
+    def active(self, now):
+        seq = int(self.client.get(self.seq_key) or 0)
+        jtis = self.client.zrangebyscore(self.expiry_key, f'({now}', '+inf')
+        return [jti.decode() for jti in jtis], seq
+
+    def purge(self, now):
+        expired = self.client.zrangebyscore(self.expiry_key, '-inf', now)
+        if not expired:
+            return 0
+        pipe = self.client.pipeline()
+        pipe.zrem(self.expiry_key, *expired)
+        pipe.zrem(self.log_key, *expired)
+        pipe.execute()
+        return len(expired)
+
+
+class TokenRevocationStore:
+    """Revoked refresh-token ids with a local bloom filter in front of the shared backend.
+
+    A jti that is not in the bloom filter is accepted without touching the
+    backend, as long as the filter has been synced within ``SYNC_INTERVAL``
+    seconds. Entries expire with the token, so the set never outgrows the
+    number of refresh tokens revoked within ``REFRESH_TOKEN_LIFETIME``.
+    """
+
+    def __init__(self, config=None):
+        self.config = {**DEFAULTS, **(config or {})}
+        backend_class = import_string(self.config['BACKEND'])
+        self.backend = backend_class(**self.config['OPTIONS'])
+        self._lock = threading.Lock()
+        self._rebuild(time.time())
+        self._last_purge = time.time()
+
+    def _new_bloom(self):
+        return BloomFilter(self.config['BLOOM_CAPACITY'], self.config['BLOOM_ERROR_RATE'])
+
+    def _rebuild(self, now):
+        jtis, cursor = self.backend.active(now)
+        bloom = self._new_bloom()
+        for jti in jtis:
+            bloom.add(jti)
+        self._bloom = bloom
+        self._cursor = cursor
+        self._synced_at = now
+        self._built_at = now
+
+    def _sync(self, now):
+        with self._lock:
+            if now - self._built_at >= self.config['BLOOM_REBUILD_INTERVAL'] or self._bloom.count >= self._bloom.capacity:
+                self._rebuild(now)
+                return
+            jtis, cursor = self.backend.added_since(self._cursor)
+            for jti in jtis:
+                self._bloom.add(jti)
+            self._cursor = cursor
+            self._synced_at = now
+
+    def revoke(self, jti, expires_at):
+        now = time.time()
+        if expires_at <= now:
+            return
+        self.backend.add(jti, expires_at)
+        with self._lock:
+            self._bloom.add(jti)
+        if now - self._last_purge >= self.config['PURGE_INTERVAL']:
+            self.purge(now)
+
+    def is_revoked(self, jti):
+        now = time.time()
+        if now - self._synced_at >= self.config['SYNC_INTERVAL']:
+            self._sync(now)
+        if jti not in self._bloom:
+            return False
+        return self.backend.contains(jti, now)
+
+    def purge(self, now=None):
+        now = time.time() if now is None else now
+        removed = self.backend.purge(now)
+        self._last_purge = now
+        with self._lock:
+            self._rebuild(now)
+        return removed
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_revocation_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TokenRevocationStore(revocation_settings())
+    return _store
+
+
+def reset_revocation_store():
+    global _store
+    _store = None
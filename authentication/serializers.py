@@ -1,9 +1,13 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rental_backend.api_tracing import TracedValidationMixin
+from .tokens import RevocableRefreshToken
 
 
-class UserRegistrationSerializer(serializers.ModelSerializer):
+class UserRegistrationSerializer(TracedValidationMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
     password_confirm = serializers.CharField(write_only=True, min_length=8)
 
@@ -16,17 +20,6 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({"password": "Passwords do not match."})
         return attrs
 
-    def create(self, validated_data):
-        validated_data.pop('password_confirm')
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data.get('email', ''),
-            password=validated_data['password'],
-            first_name=validated_data.get('first_name', ''),
-            last_name=validated_data.get('last_name', ''),
-        )
-        return user
-
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -34,7 +27,7 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ('id', 'username', 'email', 'first_name', 'last_name')
 
 
-class LoginSerializer(serializers.Serializer):
+class LoginSerializer(TracedValidationMixin, serializers.Serializer):
     username = serializers.CharField()
     password = serializers.CharField(write_only=True)
 
@@ -53,3 +46,17 @@ class LoginSerializer(serializers.Serializer):
             raise serializers.ValidationError('Must include username and password.')
         return attrs
 
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RevocableRefreshToken
+
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        try:
+            attrs['token'] = RevocableRefreshToken(attrs['refresh'])
+        except TokenError as e:
+            raise serializers.ValidationError({'refresh': str(e)})
+        return attrs
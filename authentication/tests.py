@@ -1,7 +1,13 @@
-from django.test import TestCase
+import time
+from io import StringIO
+from unittest import mock
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
 from rest_framework import status
+from .revocation import check_revocation_backend, get_revocation_store, reset_revocation_store
 
 
 class AuthenticationTests(TestCase):
@@ -88,3 +94,96 @@ class AuthenticationTests(TestCase):
         }
         response = self.client.post(self.register_url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_user_registration_runs_password_validators(self):
+        """Test that registration rejects passwords failing AUTH_PASSWORD_VALIDATORS"""
+        data = {
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password': 'password123',
+            'password_confirm': 'password123',
+        }
+        with mock.patch('authentication.registration.make_password') as make_password:
+            response = self.client.post(self.register_url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('This password is too common.', response.data['password'])
+        make_password.assert_not_called()
+        self.assertFalse(User.objects.filter(username='testuser').exists())
+
+    def test_user_registration_reports_stage_timings(self):
+        """Test that registration reports each pipeline stage in Server-Timing"""
+        data = {
+            'username': 'testuser',
+            'password': 'testpass123',
+            'password_confirm': 'testpass123',
+        }
+        response = self.client.post(self.register_url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        stages = [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+        self.assertEqual(stages, ['validate', 'password_validators', 'hash', 'insert', 'tokens'])
+        self.assertTrue(User.objects.get(username='testuser').check_password('testpass123'))
+
+
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        reset_revocation_store()
+        self.client = APIClient()
+        User.objects.create_user(username='testuser', password='testpass123')
+        response = self.client.post('/api/login', {'username': 'testuser', 'password': 'testpass123'}, format='json')
+        self.refresh = response.data['refresh']
+        self.refresh_url = '/api/token/refresh/'
+
+    def tearDown(self):
+        reset_revocation_store()
+
+    def test_refresh_rotates_and_revokes_old_token(self):
+        """Test that refreshing rotates the token and the old one can't be reused"""
+        response = self.client.post(self.refresh_url, {'refresh': self.refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('refresh', response.data)
+        self.assertNotEqual(response.data['refresh'], self.refresh)
+
+        reuse = self.client.post(self.refresh_url, {'refresh': self.refresh}, format='json')
+        self.assertEqual(reuse.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_revokes_refresh_token(self):
+        """Test that a logged-out refresh token is rejected"""
+        response = self.client.post('/api/logout', {'refresh': self.refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(self.refresh_url, {'refresh': self.refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_unrevoked_refresh_skips_backend_lookup(self):
+        """Test that the bloom filter answers for tokens that were never revoked"""
+        store = get_revocation_store()
+        with mock.patch.object(store.backend, 'contains', wraps=store.backend.contains) as contains:
+            self.assertFalse(store.is_revoked('never-revoked'))
+        contains.assert_not_called()
+
+    def test_revocation_is_shared_between_workers(self):
+        """Test that a token revoked by one worker is rejected by another"""
+        get_revocation_store().revoke('elsewhere', time.time() + 3600)
+        reset_revocation_store()
+        self.assertTrue(get_revocation_store().is_revoked('elsewhere'))
+
+    def test_purge_drops_expired_revocations(self):
+        """Test that expired revocations are removed by the purge command"""
+        store = get_revocation_store()
+        now = time.time()
+        store.revoke('expiring', now + 1)
+        store.revoke('live', now + 3600)
+        reset_revocation_store()
+
+        out = StringIO()
+        with mock.patch('authentication.revocation.time.time', return_value=now + 2):
+            call_command('purge_revoked_tokens', stdout=out)
+            store = get_revocation_store()
+            self.assertFalse(store.is_revoked('expiring'))
+            self.assertTrue(store.is_revoked('live'))
+        self.assertIn('Purged 1 expired revocations', out.getvalue())
+
+    @override_settings(TOKEN_REVOCATION={'BACKEND': 'authentication.revocation.InMemoryRevocationBackend'})
+    def test_process_local_backend_is_rejected(self):
+        """Test that a revocation backend not shared between workers is refused"""
+        with self.assertRaises(ImproperlyConfigured):
+            check_revocation_backend()
@@ -0,0 +1,14 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+from .revocation import get_revocation_store
+
+
+class RevocableRefreshToken(RefreshToken):
+    def verify(self, *args, **kwargs):
+        super().verify(*args, **kwargs)
+        if get_revocation_store().is_revoked(self.payload['jti']):
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        get_revocation_store().revoke(self.payload['jti'], self.payload['exp'])
@@ -2,25 +2,24 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
-from .serializers import UserRegistrationSerializer, UserSerializer, LoginSerializer
+from .registration import register_user
+from .serializers import UserRegistrationSerializer, UserSerializer, LoginSerializer, LogoutSerializer
+from .tokens import RevocableRefreshToken
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register(request):
-    serializer = UserRegistrationSerializer(data=request.data)
-    if serializer.is_valid():
-        user = serializer.save()
-        refresh = RefreshToken.for_user(user)
-        return Response({
-            'user': UserSerializer(user).data,
-            'refresh': str(refresh),
-            'access': str(refresh.access_token),
-            'message': 'User registered successfully'
-        }, status=status.HTTP_201_CREATED)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    user, refresh, timings = register_user(UserRegistrationSerializer(data=request.data))
+    response = Response({
+        'user': UserSerializer(user).data,
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+        'message': 'User registered successfully'
+    }, status=status.HTTP_201_CREATED)
+    response['Server-Timing'] = timings.server_timing()
+    return response
 
 
 @api_view(['POST'])
@@ -29,7 +28,7 @@ def login(request):
     serializer = LoginSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        refresh = RefreshToken.for_user(user)
+        refresh = RevocableRefreshToken.for_user(user)
         return Response({
             'user': UserSerializer(user).data,
             'refresh': str(refresh),
@@ -37,3 +36,15 @@ def login(request):
             'message': 'Login successful'
         }, status=status.HTTP_200_OK)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def logout(request):
+    serializer = LogoutSerializer(data=request.data)
+    if serializer.is_valid():
+        serializer.validated_data['token'].blacklist()
+        return Response({
+            'message': 'Logout successful'
+        }, status=status.HTTP_200_OK)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -1,11 +1,65 @@
 from django.contrib import admin
-from .models import Booking
+from rental_backend.pagination import EstimatedCountPaginator
+from .models import ArchivedBooking, Booking, BookingDailyRollup, BookingEvent, BookingHold, WebhookEndpoint
 
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'vehicle', 'start_date', 'end_date', 'status', 'deposit_paid', 'created_at')
+    list_display = ('id', 'user__username', 'vehicle__plate', 'start_date', 'end_date', 'status', 'deposit_paid', 'created_at')
     list_filter = ('status', 'start_date', 'end_date', 'deposit_paid', 'created_at')
-    search_fields = ('user__username', 'vehicle__plate', 'vehicle__make', 'vehicle__model')
+    list_select_related = ('user', 'vehicle')
+    search_fields = ('^user__username', '^vehicle__plate', '^vehicle__make', '^vehicle__model')
+    autocomplete_fields = ('user', 'vehicle')
     readonly_fields = ('created_at', 'updated_at')
     date_hierarchy = 'start_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(admin.ModelAdmin):
+    list_display = ('original_id', 'user__username', 'vehicle__plate', 'start_date', 'end_date', 'status', 'archived_at')
+    list_filter = ('status', 'archived_at')
+    list_select_related = ('user', 'vehicle')
+    search_fields = ('^user__username', '^vehicle__plate')
+    readonly_fields = [field.name for field in ArchivedBooking._meta.fields]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(BookingEvent)
+class BookingEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event_type', 'booking_id', 'owner__username', 'attempts', 'delivered_at', 'failed')
+    list_filter = ('event_type', 'failed')
+    list_select_related = ('owner',)
+    readonly_fields = ('created_at',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    list_display = ('url', 'owner__username', 'is_active', 'created_at')
+    list_filter = ('is_active',)
+    list_select_related = ('owner',)
+    autocomplete_fields = ('owner',)
+
+
+@admin.register(BookingHold)
+class BookingHoldAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user__username', 'vehicle__plate', 'start_date', 'end_date', 'expires_at', 'booking')
+    list_select_related = ('user', 'vehicle')
+    autocomplete_fields = ('user', 'vehicle')
+    readonly_fields = ('created_at',)
+
+
+@admin.register(BookingDailyRollup)
+class BookingDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'vehicle__plate', 'owner__username', 'status', 'bookings', 'deposit_amount', 'deposit_paid_amount')
+    list_filter = ('status', 'day')
+    list_select_related = ('vehicle', 'owner')
+    readonly_fields = [field.name for field in BookingDailyRollup._meta.fields]
+    date_hierarchy = 'day'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
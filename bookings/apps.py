@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class BookingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bookings'
+
+    def ready(self):
+        from rental_backend.idempotency import check_cache_backend
+        from rental_backend.throttling import check_throttle_cache
+        from . import signals  # noqa: F401
+
+        check_cache_backend()
+        check_throttle_cache()
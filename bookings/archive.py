@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+from django.db import router, transaction
+from .models import ArchivedBooking, Booking
+
+
+def archivable_bookings(cutoff):
+    return Booking.objects.filter(
+        status__in=ArchivedBooking.ARCHIVABLE_STATUSES,
+        end_date__lt=cutoff
+    )
+
+
+def archive_batch(cutoff, batch_size=1000):
+    with transaction.atomic(using=router.db_for_write(Booking)):
+        batch = list(
+            archivable_bookings(cutoff)
+            .order_by('pk')
+            .select_for_update()[:batch_size]
+        )
+        if not batch:
+            return 0
+        ArchivedBooking.objects.bulk_create(
+            [ArchivedBooking.from_booking(booking) for booking in batch],
+            ignore_conflicts=True
+        )
+        Booking.objects.filter(pk__in=[booking.pk for booking in batch]).delete()
+    return len(batch)
+
+
+def archive_bookings(older_than_days=90, batch_size=1000, max_batches=None):
+    cutoff = date.today() - timedelta(days=older_than_days)
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(cutoff, batch_size=batch_size)
+        if not moved:
+            break
+        total += moved
+        batches += 1
+    return total
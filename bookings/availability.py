@@ -0,0 +1,125 @@
+from bisect import bisect_right
+from collections import defaultdict
+from decimal import Decimal
+from django.db import router, transaction
+from vehicles.models import Vehicle
+from .holds import active_holds
+from .models import Booking, BookingDailyRollup, BookingEvent
+from .payments import calculate_deposit
+
+
+class IntervalSet:
+    """Disjoint, sorted date intervals for one vehicle (inclusive on both ends)."""
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(intervals):
+            self._append(start, end)
+
+    def _append(self, start, end):
+        if self.ends and start <= self.ends[-1]:
+            self.ends[-1] = max(self.ends[-1], end)
+        else:
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def overlaps(self, start, end):
+        index = bisect_right(self.starts, end) - 1
+        return index >= 0 and self.ends[index] >= start
+
+    def add(self, start, end):
+        merged = IntervalSet([*zip(self.starts, self.ends), (start, end)])
+        self.starts, self.ends = merged.starts, merged.ends
+
+
+def load_intervals(items, user_id=None):
+    """Fetch active bookings for every vehicle in ``items`` with one query.
+
+    Holds placed by other users count as taken.
+    """
+    if not items:
+        return {}
+    vehicle_ids = {item['vehicle'] for item in items}
+    intervals = defaultdict(list)
+    rows = Booking.objects.filter(
+        vehicle_id__in=vehicle_ids,
+        status__in=Booking.ACTIVE_STATUSES,
+        start_date__lte=max(item['end_date'] for item in items),
+        end_date__gte=min(item['start_date'] for item in items),
+    ).values_list('vehicle_id', 'start_date', 'end_date')
+    for vehicle_id, start_date, end_date in rows:
+        intervals[vehicle_id].append((start_date, end_date))
+    for vehicle_id, holds in active_holds(vehicle_ids).items():
+        intervals[vehicle_id].extend((start, end) for hold_user_id, start, end, _ in holds if hold_user_id != user_id)
+    return {vehicle_id: IntervalSet(intervals[vehicle_id]) for vehicle_id in vehicle_ids}
+
+
+def quote(start_date, end_date):
+    return Decimal(str(calculate_deposit(start_date, end_date))).quantize(Decimal('0.01'))
+
+
+def check_items(items, vehicles, intervals, hold_accepted=False):
+    results = []
+    for index, item in enumerate(items):
+        result = {
+            'index': index,
+            'vehicle': item['vehicle'],
+            'start_date': item['start_date'],
+            'end_date': item['end_date'],
+            'deposit_amount': quote(item['start_date'], item['end_date']),
+        }
+        if item['vehicle'] not in vehicles:
+            result.update(available=False, reason='Vehicle not found.')
+        elif intervals[item['vehicle']].overlaps(item['start_date'], item['end_date']):
+            result.update(available=False, reason='This vehicle is already booked for the selected dates.')
+        else:
+            result.update(available=True, reason=None)
+            if hold_accepted:
+                intervals[item['vehicle']].add(item['start_date'], item['end_date'])
+        results.append(result)
+    return results
+
+
+def check_availability(user, items):
+    vehicles = {
+        vehicle.pk: vehicle
+        for vehicle in Vehicle.objects.filter(pk__in={item['vehicle'] for item in items}).only('pk', 'owner_id')
+    }
+    return check_items(items, vehicles, load_intervals(items, user.pk))
+
+
+def reserve_available(user, items):
+    """Atomically book every available item; later items must not clash with earlier ones."""
+    with transaction.atomic(using=router.db_for_write(Booking)):
+        vehicles = {
+            vehicle.pk: vehicle
+            for vehicle in Vehicle.objects.select_for_update()
+            .filter(pk__in={item['vehicle'] for item in items})
+            .only('pk', 'owner_id', 'city', 'make', 'model', 'year', 'plate')
+        }
+        results = check_items(items, vehicles, load_intervals(items, user.pk), hold_accepted=True)
+        accepted = [result for result in results if result['available']]
+        bookings = Booking.objects.bulk_create([
+            Booking(
+                user=user,
+                vehicle=vehicles[result['vehicle']],
+                owner_id=vehicles[result['vehicle']].owner_id,
+                city=vehicles[result['vehicle']].city,
+                user_username=user.username,
+                **Booking.vehicle_snapshot(vehicles[result['vehicle']]),
+                start_date=result['start_date'],
+                end_date=result['end_date'],
+                status='pending',
+                deposit_amount=result['deposit_amount'],
+                deposit_paid=False,
+            )
+            for result in accepted
+        ])
+        BookingEvent.objects.bulk_create([
+            BookingEvent.for_booking(booking, 'booking.created') for booking in bookings
+        ])
+        BookingDailyRollup.apply([(booking.rollup_values(), 1) for booking in bookings])
+    for result, booking in zip(accepted, bookings):
+        result['booking'] = booking.pk
+    return results
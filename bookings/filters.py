@@ -0,0 +1,120 @@
+from django.db.models import Q
+from rest_framework import serializers
+from .models import Booking
+
+
+class BookingFilterSerializer(serializers.Serializer):
+    """Query parameters accepted by booking lists.
+
+    ``from``/``to`` select bookings that touch the window: a booking matches
+    when it starts on or before ``to`` and ends on or after ``from``.
+    """
+    to = serializers.DateField(required=False)
+    status = serializers.ChoiceField(choices=Booking.STATUS_CHOICES, required=False)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fields['from'] = serializers.DateField(required=False)
+        return fields
+
+    def validate(self, attrs):
+        from_date = attrs.get('from')
+        to_date = attrs.get('to')
+        if from_date and to_date and to_date < from_date:
+            raise serializers.ValidationError({'to': '"to" must be on or after "from".'})
+        return attrs
+
+
+def filter_bookings(queryset, params):
+    serializer = BookingFilterSerializer(data={
+        key: value for key, value in params.items() if key in ('from', 'to', 'status') and value != ''
+    })
+    serializer.is_valid(raise_exception=True)
+    filters = serializer.validated_data
+
+    if 'from' in filters:
+        queryset = queryset.filter(end_date__gte=filters['from'])
+    if 'to' in filters:
+        queryset = queryset.filter(start_date__lte=filters['to'])
+    if 'status' in filters:
+        queryset = queryset.filter(status=filters['status'])
+    return queryset.order_by('-created_at')
+
+
+class KeysetCursorField(serializers.CharField):
+    """``<created_at>,<id>`` of the last row of the previous page, as returned in ``next_before``."""
+
+    def to_internal_value(self, data):
+        created_at, _, pk = str(data).rpartition(',')
+        try:
+            return serializers.DateTimeField().to_internal_value(created_at), int(pk)
+        except (serializers.ValidationError, ValueError):
+            raise serializers.ValidationError('Expected the "<created_at>,<id>" cursor from next_before.')
+
+
+def keyset_cursor(item):
+    return f"{item['created_at']},{item['id']}"
+
+
+class HistoryFilterSerializer(BookingFilterSerializer):
+    """Query parameters of the booking history; ``before`` pages back by ``(created_at, id)``."""
+    MAX_LIMIT = 200
+
+    before = KeysetCursorField(required=False)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=MAX_LIMIT, default=50)
+
+
+def history_filters(params):
+    serializer = HistoryFilterSerializer(data={
+        key: value for key, value in params.items()
+        if key in ('from', 'to', 'status', 'before', 'limit') and value != ''
+    })
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+def filter_history(queryset, filters, id_field='pk'):
+    """Newest ``limit`` rows of ``queryset`` matching validated history ``filters``.
+
+    Rows are ordered by ``(created_at, id_field)`` so rows sharing a timestamp
+    are neither repeated nor skipped between pages.
+    """
+    if 'from' in filters:
+        queryset = queryset.filter(end_date__gte=filters['from'])
+    if 'to' in filters:
+        queryset = queryset.filter(start_date__lte=filters['to'])
+    if 'status' in filters:
+        queryset = queryset.filter(status=filters['status'])
+    if 'before' in filters:
+        created_at, pk = filters['before']
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, **{f'{id_field}__lt': pk})
+        )
+    return queryset.order_by('-created_at', f'-{id_field}')[:filters['limit']]
+
+
+class ReportFilterSerializer(BookingFilterSerializer):
+    """Query parameters of the rollup report; ``from``/``to`` bound the booking start day."""
+    period = serializers.ChoiceField(choices=('day', 'month'), default='month')
+    vehicle = serializers.IntegerField(required=False, min_value=1)
+
+
+def report_filters(params):
+    serializer = ReportFilterSerializer(data={
+        key: value for key, value in params.items()
+        if key in ('from', 'to', 'status', 'period', 'vehicle') and value != ''
+    })
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+def filter_rollups(queryset, filters):
+    if 'from' in filters:
+        queryset = queryset.filter(day__gte=filters['from'])
+    if 'to' in filters:
+        queryset = queryset.filter(day__lte=filters['to'])
+    if 'status' in filters:
+        queryset = queryset.filter(status=filters['status'])
+    if 'vehicle' in filters:
+        queryset = queryset.filter(vehicle_id=filters['vehicle'])
+    return queryset
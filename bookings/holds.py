@@ -0,0 +1,137 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+from vehicles.models import Vehicle
+from .models import Booking, BookingHold
+from .payments import calculate_deposit
+
+HOLD_CONFLICT_MESSAGE = "This vehicle is held by another customer for the selected dates."
+
+
+def hold_ttl():
+    return getattr(settings, 'BOOKING_HOLD_TTL', 600)
+
+
+def max_holds_per_user():
+    return getattr(settings, 'BOOKING_HOLD_MAX_PER_USER', 5)
+
+
+def active_holds(vehicle_ids):
+    """Map vehicle id to its unexpired, unconverted holds as ``(user_id, start, end, expires_at)``.
+
+    Read straight from the database (one query on ``bookinghold_active_idx``)
+    so a hold placed by any worker is visible as soon as it commits.
+    """
+    holds = {vehicle_id: [] for vehicle_id in vehicle_ids}
+    rows = BookingHold.objects.filter(
+        vehicle_id__in=holds, booking__isnull=True, expires_at__gt=timezone.now()
+    ).values_list('vehicle_id', 'user_id', 'start_date', 'end_date', 'expires_at')
+    for vehicle_id, *hold in rows:
+        holds[vehicle_id].append(tuple(hold))
+    return holds
+
+
+def held_by_others(vehicle_id, start_date, end_date, user_id=None):
+    return any(
+        hold_user_id != user_id and hold_start <= end_date and hold_end >= start_date
+        for hold_user_id, hold_start, hold_end, _ in active_holds([vehicle_id])[vehicle_id]
+    )
+
+
+def _overlapping(queryset, start_date, end_date):
+    return queryset.filter(start_date__lte=end_date, end_date__gte=start_date)
+
+
+def _conflict(message):
+    return serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]})
+
+
+def lock_vehicle(vehicle_id):
+    Vehicle.objects.select_for_update().filter(pk=vehicle_id).first()
+
+
+def lock_dates(vehicle, start_date, end_date, user_id=None, exclude_booking=None):
+    """Lock ``vehicle`` and check that nobody else holds or has booked the dates.
+
+    Must run inside the transaction that writes the booking or hold: the row
+    lock on the vehicle serialises writers, so the checks cannot race a
+    concurrent hold or booking for the same vehicle. This is the only
+    availability check for booking and hold writes; serializers don't repeat
+    it without the lock.
+    """
+    lock_vehicle(vehicle.pk)
+    other_holds = BookingHold.objects.filter(
+        vehicle=vehicle, booking__isnull=True, expires_at__gt=timezone.now()
+    ).exclude(user_id=user_id)
+    if _overlapping(other_holds, start_date, end_date).exists():
+        raise _conflict(HOLD_CONFLICT_MESSAGE)
+    bookings = Booking.objects.filter(vehicle=vehicle, status__in=Booking.ACTIVE_STATUSES)
+    if exclude_booking is not None:
+        bookings = bookings.exclude(pk=exclude_booking.pk)
+    if _overlapping(bookings, start_date, end_date).exists():
+        raise _conflict("This vehicle is already booked for the selected dates.")
+
+
+def place_hold(user, vehicle, start_date, end_date):
+    with transaction.atomic(using=router.db_for_write(BookingHold)):
+        lock_dates(vehicle, start_date, end_date, user.pk)
+        now = timezone.now()
+        held = BookingHold.objects.filter(user=user, booking__isnull=True, expires_at__gt=now).count()
+        if held >= max_holds_per_user():
+            raise serializers.ValidationError(
+                f"You already hold {held} vehicles. Confirm or release a hold first."
+            )
+        return BookingHold.objects.create(
+            user=user,
+            vehicle=vehicle,
+            start_date=start_date,
+            end_date=end_date,
+            expires_at=now + timedelta(seconds=hold_ttl()),
+        )
+
+
+def confirm_hold(hold):
+    with transaction.atomic(using=router.db_for_write(BookingHold)):
+        # Vehicle first, then hold: the order place_hold and booking writes take them in.
+        lock_vehicle(hold.vehicle_id)
+        hold = BookingHold.objects.select_for_update().select_related('vehicle').get(pk=hold.pk)
+        if hold.booking_id is not None:
+            raise serializers.ValidationError("This hold has already been confirmed.")
+        if hold.expires_at <= timezone.now():
+            raise serializers.ValidationError("This hold has expired.")
+        bookings = Booking.objects.filter(vehicle_id=hold.vehicle_id, status__in=Booking.ACTIVE_STATUSES)
+        if _overlapping(bookings, hold.start_date, hold.end_date).exists():
+            raise serializers.ValidationError("This vehicle is already booked for the selected dates.")
+        booking = Booking(
+            user_id=hold.user_id,
+            vehicle=hold.vehicle,
+            start_date=hold.start_date,
+            end_date=hold.end_date,
+            status='pending',
+            deposit_amount=calculate_deposit(hold.start_date, hold.end_date),
+            deposit_paid=False,
+        )
+        booking.save()
+        hold.booking = booking
+        hold.save(update_fields=['booking'])
+    return booking
+
+
+def release_hold(hold):
+    hold.delete()
+
+
+def expire_holds(batch_size=1000):
+    total = 0
+    while True:
+        expired = list(
+            BookingHold.objects.filter(booking__isnull=True, expires_at__lte=timezone.now())
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not expired:
+            return total
+        BookingHold.objects.filter(pk__in=expired).delete()
+        total += len(expired)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from rental_backend.sharding import fan_out
+from bookings.archive import archive_bookings
+
+
+class Command(BaseCommand):
+    help = 'Move completed and cancelled bookings that ended long ago into the archive table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=90)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-batches', type=int, default=None)
+
+    def handle(self, *args, **options):
+        moved = sum(fan_out(lambda: archive_bookings(
+            older_than_days=options['older_than_days'],
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+        )).values())
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} bookings'))
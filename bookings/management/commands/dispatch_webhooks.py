@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from rental_backend.sharding import fan_out
+from bookings.webhooks import dispatch_pending_events
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending booking events from the outbox to owner webhooks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--loop', action='store_true', help='Keep running and poll the outbox.')
+        parser.add_argument('--interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        while True:
+            delivered = sum(fan_out(lambda: dispatch_pending_events(batch_size=options['batch_size'])).values())
+            self.stdout.write(f'Delivered {delivered} events')
+            if not options['loop']:
+                break
+            if not delivered:
+                time.sleep(options['interval'])
@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from rental_backend.sharding import fan_out
+from bookings.holds import expire_holds
+
+
+class Command(BaseCommand):
+    help = 'Delete booking holds that expired without being confirmed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--loop', action='store_true', help='Keep running and expire holds periodically.')
+        parser.add_argument('--interval', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        while True:
+            expired = sum(fan_out(lambda: expire_holds(batch_size=options['batch_size'])).values())
+            self.stdout.write(f'Expired {expired} holds')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from rental_backend.sharding import fan_out
+from bookings.webhooks import prune_delivered_events
+
+
+class Command(BaseCommand):
+    help = "Delete outbox events delivered longer ago than WEBHOOKS['RETENTION']."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        pruned = sum(fan_out(lambda: prune_delivered_events(batch_size=options['batch_size'])).values())
+        self.stdout.write(f'Pruned {pruned} delivered events')
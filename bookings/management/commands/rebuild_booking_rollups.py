@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from rental_backend.sharding import fan_out
+from bookings.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily booking rollups from live and archived bookings on every shard.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rows = sum(fan_out(lambda: rebuild_rollups(batch_size=options['batch_size'])).values())
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} rollup rows'))
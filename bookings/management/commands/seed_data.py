@@ -0,0 +1,202 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from itertools import islice
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from rental_backend.sharding import sharding_settings, use_city
+from bookings.models import Booking
+from bookings.rollups import rebuild_rollups
+from bookings.payments import calculate_deposit
+from vehicles.models import Vehicle
+
+MAKES = {
+    'Toyota': ['Corolla', 'Yaris', 'Camry', 'Fortuner', 'Hilux'],
+    'Honda': ['Civic', 'City', 'Accord', 'BR-V'],
+    'Suzuki': ['Alto', 'Cultus', 'Swift', 'Wagon R'],
+    'Hyundai': ['Elantra', 'Tucson', 'Sonata'],
+    'Kia': ['Sportage', 'Picanto', 'Sorento'],
+}
+
+
+@contextmanager
+def historical_timestamps(model):
+    """Let bulk_create keep the created_at/updated_at values we generate."""
+    fields = [model._meta.get_field('created_at'), model._meta.get_field('updated_at')]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+@contextmanager
+def fast_sqlite_writes(alias):
+    connection = connections[alias]
+    # SQLite refuses to change the sync level inside a transaction (e.g. under tests).
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous = OFF')
+        cursor.execute('PRAGMA cache_size = -200000')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous = FULL')
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def split_quota(rng, total, buckets):
+    """Split ``total`` across ``buckets`` with a long-tailed popularity distribution."""
+    weights = [rng.paretovariate(1.5) for _ in range(buckets)]
+    scale = total / sum(weights)
+    quotas = [int(weight * scale) for weight in weights]
+    for index in rng.sample(range(buckets), total - sum(quotas)):
+        quotas[index] += 1
+    return quotas
+
+
+class Command(BaseCommand):
+    help = 'Generate deterministic users, vehicles and non-overlapping bookings for benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--vehicles', type=int, default=200)
+        parser.add_argument('--bookings', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--history-days', type=int, default=730)
+        parser.add_argument('--future-days', type=int, default=120)
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--city', help='City whose shard receives the vehicles and bookings.')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['vehicles'] < 1:
+            raise CommandError('--users and --vehicles must be at least 1.')
+        city = options['city'] or sharding_settings()['DEFAULT_CITY']
+        if city not in sharding_settings()['CITIES']:
+            raise CommandError(f'Unknown city: {city}.')
+        if User.objects.filter(username__startswith=f"{options['prefix']}_").exists():
+            raise CommandError(f"Seed data with prefix {options['prefix']!r} already exists.")
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.today = date.today()
+        started = time.perf_counter()
+
+        with use_city(city) as shard, fast_sqlite_writes('default'), fast_sqlite_writes(shard):
+            users = self.create_users(options['users'], options['prefix'])
+            vehicles = self.create_vehicles(options['vehicles'], options['prefix'], users)
+            created = self.create_bookings(options['bookings'], vehicles, users, options)
+            # bulk_create skips Booking.save(), which keeps the rollups current.
+            rebuild_rollups(batch_size=self.batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users, {len(vehicles)} vehicles and {created} bookings "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
+
+    def insert(self, model, objects):
+        count = 0
+        for batch in batched(objects, self.batch_size):
+            with transaction.atomic(using=router.db_for_write(model)):
+                model.objects.bulk_create(batch, batch_size=self.batch_size)
+            count += len(batch)
+        return count
+
+    def create_users(self, count, prefix):
+        password = make_password('seedpass123')
+        self.insert(User, (
+            User(username=f'{prefix}_user{n:07d}', email=f'{prefix}_user{n:07d}@example.com', password=password)
+            for n in range(count)
+        ))
+        return list(User.objects.filter(username__startswith=f'{prefix}_user').order_by('pk').values_list('pk', 'username'))
+
+    def create_vehicles(self, count, prefix, users):
+        # Roughly one renter in twenty also runs a fleet.
+        owners = [pk for pk, _ in users[:max(1, len(users) // 20)]]
+        makes = list(MAKES)
+        vehicles = []
+        for n in range(count):
+            make = self.rng.choice(makes)
+            vehicles.append(Vehicle(
+                owner_id=self.rng.choice(owners),
+                make=make,
+                model=self.rng.choice(MAKES[make]),
+                year=self.rng.randint(2010, self.today.year),
+                plate=f'{prefix.upper()}-{n:07d}',
+            ))
+        self.insert(Vehicle, vehicles)
+        return list(
+            Vehicle.objects.filter(plate__startswith=f'{prefix.upper()}-').order_by('pk')
+            .values_list('pk', 'owner_id', 'city', 'make', 'model', 'year', 'plate', named=True)
+        )
+
+    def status_for(self, start_date, end_date):
+        roll = self.rng.random()
+        if end_date < self.today:
+            return 'cancelled' if roll < 0.15 else 'completed'
+        if start_date <= self.today:
+            return 'confirmed'
+        if roll < 0.1:
+            return 'cancelled'
+        return 'pending' if roll < 0.5 else 'confirmed'
+
+    def booking_rows(self, total, vehicles, users, options):
+        horizon = self.today + timedelta(days=options['future_days'])
+        default_span = options['history_days'] + options['future_days']
+        for vehicle, quota in zip(vehicles, split_quota(self.rng, total, len(vehicles))):
+            if not quota:
+                continue
+            snapshot = Booking.vehicle_snapshot(vehicle)
+            # Lay bookings out back to back in equal slots ending at the horizon,
+            # so a vehicle's bookings never overlap whatever their status.
+            span = max(default_span, quota)
+            slot = span / quota
+            first_day = horizon - timedelta(days=span)
+            for i in range(quota):
+                slot_start = int(i * slot)
+                slot_days = max(1, int((i + 1) * slot) - slot_start)
+                duration = min(slot_days, 1 + int(self.rng.expovariate(1 / 3)))
+                offset = self.rng.randint(0, slot_days - duration)
+                start_date = first_day + timedelta(days=slot_start + offset)
+                end_date = start_date + timedelta(days=duration - 1)
+                status = self.status_for(start_date, end_date)
+                booked_on = min(start_date - timedelta(days=self.rng.randint(0, 60)), self.today - timedelta(days=1))
+                created_at = datetime.combine(booked_on, datetime.min.time(), dt_timezone.utc) + timedelta(
+                    seconds=self.rng.randint(0, 86399)
+                )
+                user_id, username = self.rng.choice(users)
+                yield Booking(
+                    user_id=user_id,
+                    vehicle_id=vehicle.pk,
+                    owner_id=vehicle.owner_id,
+                    city=vehicle.city,
+                    user_username=username,
+                    **snapshot,
+                    start_date=start_date,
+                    end_date=end_date,
+                    status=status,
+                    deposit_amount=Decimal(str(calculate_deposit(start_date, end_date))),
+                    deposit_paid=status in ('confirmed', 'completed'),
+                    created_at=created_at,
+                    updated_at=created_at,
+                )
+
+    def create_bookings(self, total, vehicles, users, options):
+        with historical_timestamps(Booking):
+            return self.insert(Booking, self.booking_rows(total, vehicles, users, options))
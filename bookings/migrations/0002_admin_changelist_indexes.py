@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+        ('vehicles', '0002_admin_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['start_date'], name='booking_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'start_date'], name='booking_status_start_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:20
+
+import bookings.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_archivedbooking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEndpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500)),
+                ('secret', models.CharField(default=bookings.models.generate_webhook_secret, max_length=64)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='webhook_endpoints', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Webhook endpoint',
+                'verbose_name_plural': 'Webhook endpoints',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BookingEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('booking.created', 'Booking created'), ('booking.status_changed', 'Booking status changed')], max_length=40)),
+                ('booking_id', models.BigIntegerField()),
+                ('payload', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('failed', models.BooleanField(default=False)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Booking event',
+                'verbose_name_plural': 'Booking events',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['owner', 'id'], name='bookingevent_owner_id_idx'), models.Index(condition=models.Q(('delivered_at__isnull', True), ('failed', False)), fields=['next_attempt_at', 'id'], name='bookingevent_pending_idx')],
+            },
+        ),
+    ]
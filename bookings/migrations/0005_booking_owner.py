@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_owner(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    Vehicle = apps.get_model('vehicles', 'Vehicle')
+    for vehicle_id, owner_id in Vehicle.objects.values_list('pk', 'owner_id').iterator():
+        Booking.objects.filter(vehicle_id=vehicle_id).update(owner_id=owner_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_booking_event_outbox'),
+        ('vehicles', '0002_admin_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='owner',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='owner_bookings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(populate_owner, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='booking',
+            name='owner',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='owner_bookings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['owner', '-created_at'], name='booking_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['owner', 'status', '-created_at'], name='booking_owner_status_idx'),
+        ),
+    ]
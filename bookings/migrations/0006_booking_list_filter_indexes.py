@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_booking_owner'),
+        ('vehicles', '0002_admin_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', '-created_at'], name='booking_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'status', '-created_at'], name='booking_user_status_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_booking_list_filter_indexes'),
+        ('vehicles', '0002_admin_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='hold', to='bookings.booking')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_holds', to=settings.AUTH_USER_MODEL)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='vehicles.vehicle')),
+            ],
+            options={
+                'verbose_name': 'Booking hold',
+                'verbose_name_plural': 'Booking holds',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('booking__isnull', True)), fields=['vehicle', 'expires_at'], name='bookinghold_active_idx'), models.Index(fields=['expires_at'], name='bookinghold_expires_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:37
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_snapshot(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    Vehicle = apps.get_model('vehicles', 'Vehicle')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    vehicle = Vehicle.objects.filter(pk=OuterRef('vehicle_id'))
+    Booking.objects.update(
+        user_username=Subquery(User.objects.filter(pk=OuterRef('user_id')).values('username')[:1]),
+        vehicle_make=Subquery(vehicle.values('make')[:1]),
+        vehicle_model=Subquery(vehicle.values('model')[:1]),
+        vehicle_year=Subquery(vehicle.values('year')[:1]),
+        vehicle_plate=Subquery(vehicle.values('plate')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_bookinghold'),
+        ('vehicles', '0002_admin_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='user_username',
+            field=models.CharField(blank=True, editable=False, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='vehicle_make',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='vehicle_model',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='vehicle_plate',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='vehicle_year',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_snapshot, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:41
+
+import django.db.models.deletion
+import rental_backend.sharding
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_booking_snapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='city',
+            field=models.CharField(default=rental_backend.sharding.current_city, editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='city',
+            field=models.CharField(default=rental_backend.sharding.current_city, editable=False, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='archivedbooking',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='owner',
+            field=models.ForeignKey(db_constraint=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='owner_bookings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='bookingevent',
+            name='owner',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='booking_events', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='bookinghold',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='booking_holds', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='webhookendpoint',
+            name='owner',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='webhook_endpoints', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
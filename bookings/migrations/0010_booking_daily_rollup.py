@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_rollups(apps, schema_editor):
+    from bookings.rollups import aggregate_bookings
+
+    alias = schema_editor.connection.alias
+    Rollup = apps.get_model('bookings', 'BookingDailyRollup')
+    totals = aggregate_bookings(
+        apps.get_model('bookings', 'Booking'), apps.get_model('bookings', 'ArchivedBooking'), using=alias
+    )
+    Rollup.objects.using(alias).bulk_create(
+        (
+            Rollup(day=day, vehicle_id=vehicle_id, status=status, **total)
+            for (day, vehicle_id, status), total in totals.items()
+        ),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_city_shards'),
+        ('vehicles', '0003_vehicle_city'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('bookings', models.IntegerField(default=0)),
+                ('deposit_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('deposit_paid_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('owner', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='booking_rollups', to=settings.AUTH_USER_MODEL)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='vehicles.vehicle')),
+            ],
+            options={
+                'verbose_name': 'Booking daily rollup',
+                'verbose_name_plural': 'Booking daily rollups',
+                'ordering': ['day', 'vehicle', 'status'],
+                'indexes': [models.Index(fields=['owner', 'day'], name='booking_rollup_owner_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'vehicle', 'status'), name='booking_rollup_key')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
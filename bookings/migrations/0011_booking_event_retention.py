@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0010_booking_daily_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookingevent',
+            index=models.Index(condition=models.Q(('delivered_at__isnull', False)), fields=['delivered_at'], name='bookingevent_delivered_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0011_booking_event_retention'),
+        ('vehicles', '0004_prefix_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'start_date', 'end_date'], name='booking_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['owner', 'start_date', 'end_date'], name='booking_owner_start_idx'),
+        ),
+    ]
@@ -1,4 +1,9 @@
-from django.db import models
+import secrets
+from decimal import Decimal
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import F
+from rental_backend.sharding import current_city
+from rental_backend.tracing import span
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from vehicles.models import Vehicle
@@ -11,9 +16,20 @@ class Booking(models.Model):
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
     ]
+    ACTIVE_STATUSES = ('pending', 'confirmed')
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings', db_constraint=False)
     vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='bookings')
+    owner = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='owner_bookings', editable=False, db_constraint=False
+    )
+    city = models.CharField(max_length=50, default=current_city, editable=False)
+    # Snapshot of the renter and vehicle so list views don't need joins.
+    user_username = models.CharField(max_length=150, blank=True, editable=False)
+    vehicle_make = models.CharField(max_length=100, blank=True, editable=False)
+    vehicle_model = models.CharField(max_length=100, blank=True, editable=False)
+    vehicle_year = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    vehicle_plate = models.CharField(max_length=20, blank=True, editable=False)
     start_date = models.DateField()
     end_date = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -26,15 +42,329 @@ class Booking(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Booking'
         verbose_name_plural = 'Bookings'
+        indexes = [
+            models.Index(fields=['start_date'], name='booking_start_date_idx'),
+            models.Index(fields=['status', 'start_date'], name='booking_status_start_idx'),
+            models.Index(fields=['user', '-created_at'], name='booking_user_created_idx'),
+            models.Index(fields=['user', 'status', '-created_at'], name='booking_user_status_idx'),
+            models.Index(fields=['owner', '-created_at'], name='booking_owner_created_idx'),
+            models.Index(fields=['owner', 'status', '-created_at'], name='booking_owner_status_idx'),
+            models.Index(fields=['user', 'start_date', 'end_date'], name='booking_user_start_idx'),
+            models.Index(fields=['owner', 'start_date', 'end_date'], name='booking_owner_start_idx'),
+        ]
 
     def clean(self):
         if self.start_date and self.end_date:
             if self.end_date < self.start_date:
                 raise ValidationError("End date must be after start date.")
 
+    @staticmethod
+    def vehicle_snapshot(vehicle):
+        return {
+            'vehicle_make': vehicle.make,
+            'vehicle_model': vehicle.model,
+            'vehicle_year': vehicle.year,
+            'vehicle_plate': vehicle.plate,
+        }
+
+    ROLLUP_FIELDS = ('start_date', 'vehicle_id', 'owner_id', 'status', 'deposit_amount', 'deposit_paid')
+
+    def rollup_values(self):
+        return tuple(getattr(self, field) for field in self.ROLLUP_FIELDS)
+
+    def _written_rollup_values(self, previous, update_fields):
+        """Rollup values of the row after saving ``update_fields``; fields not written keep their stored values."""
+        if previous is None or update_fields is None:
+            return self.rollup_values()
+        written = {self._meta.get_field(name).attname for name in update_fields}
+        return tuple(
+            getattr(self, field) if field in written else stored
+            for field, stored in zip(self.ROLLUP_FIELDS, previous)
+        )
+
+    def _stored_rollup_values(self, using):
+        """The row's committed rollup values, locked until the end of the transaction."""
+        return (
+            Booking.objects.using(using).select_for_update()
+            .filter(pk=self.pk).values_list(*self.ROLLUP_FIELDS).first()
+        )
+
     def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+        if self.vehicle_id is not None:
+            self.owner_id = self.vehicle.owner_id
+            self.city = self.vehicle.city
+        if self._state.adding:
+            if self.user_id is not None:
+                self.user_username = self.user.username
+            if self.vehicle_id is not None:
+                for field, value in self.vehicle_snapshot(self.vehicle).items():
+                    setattr(self, field, value)
+        with span('booking.full_clean'):
+            self.full_clean()
+        created = self._state.adding
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            previous = None if created else self._stored_rollup_values(using)
+            update_fields = kwargs.get('update_fields')
+            moved = (
+                previous is not None and previous[self.ROLLUP_FIELDS.index('vehicle_id')] != self.vehicle_id
+                and (update_fields is None or 'vehicle' in update_fields or 'vehicle_id' in update_fields)
+            )
+            if moved:
+                # Moved to another vehicle: the snapshot must describe that vehicle.
+                snapshot = self.vehicle_snapshot(self.vehicle)
+                for field, value in snapshot.items():
+                    setattr(self, field, value)
+                if update_fields is not None:
+                    # Owner and city follow the vehicle, so they are written with it.
+                    kwargs['update_fields'] = [*update_fields, 'owner', 'city', *snapshot]
+            super().save(*args, **kwargs)
+            current = self._written_rollup_values(previous, kwargs.get('update_fields'))
+            status = self.ROLLUP_FIELDS.index('status')
+            if created:
+                BookingEvent.record(self, 'booking.created')
+            elif previous is not None and previous[status] != current[status]:
+                BookingEvent.record(self, 'booking.status_changed')
+            if previous != current:
+                BookingDailyRollup.apply([(previous, -1), (current, 1)], using=using)
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            BookingDailyRollup.apply([(self._stored_rollup_values(using), -1)], using=using)
+            return super().delete(*args, **kwargs)
+
+    def __str__(self):
+        vehicle = f"{self.vehicle_year} {self.vehicle_make} {self.vehicle_model} - {self.vehicle_plate}"
+        return f"{self.user_username} - {vehicle} ({self.start_date} to {self.end_date})"
+
+
+class ArchivedBooking(models.Model):
+    ARCHIVABLE_STATUSES = ('completed', 'cancelled')
+
+    original_id = models.BigIntegerField(unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_bookings', db_constraint=False)
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='archived_bookings')
+    city = models.CharField(max_length=50, default=current_city, editable=False)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    deposit_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    deposit_paid = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Archived booking'
+        verbose_name_plural = 'Archived bookings'
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_user_created_idx'),
+        ]
+
+    @classmethod
+    def from_booking(cls, booking):
+        return cls(
+            original_id=booking.pk,
+            user_id=booking.user_id,
+            vehicle_id=booking.vehicle_id,
+            city=booking.city,
+            start_date=booking.start_date,
+            end_date=booking.end_date,
+            status=booking.status,
+            deposit_amount=booking.deposit_amount,
+            deposit_paid=booking.deposit_paid,
+            created_at=booking.created_at,
+            updated_at=booking.updated_at,
+        )
+
+    def __str__(self):
+        return f"Archived #{self.original_id} ({self.start_date} to {self.end_date})"
+
+
+class BookingEvent(models.Model):
+    """Transactional outbox row, written in the same transaction as the booking change."""
+
+    EVENT_CHOICES = [
+        ('booking.created', 'Booking created'),
+        ('booking.status_changed', 'Booking status changed'),
+    ]
+
+    event_type = models.CharField(max_length=40, choices=EVENT_CHOICES)
+    booking_id = models.BigIntegerField()
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='booking_events', db_constraint=False)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    failed = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Booking event'
+        verbose_name_plural = 'Booking events'
+        indexes = [
+            models.Index(fields=['owner', 'id'], name='bookingevent_owner_id_idx'),
+            models.Index(
+                fields=['next_attempt_at', 'id'],
+                name='bookingevent_pending_idx',
+                condition=models.Q(delivered_at__isnull=True, failed=False),
+            ),
+            models.Index(
+                fields=['delivered_at'],
+                name='bookingevent_delivered_idx',
+                condition=models.Q(delivered_at__isnull=False),
+            ),
+        ]
+
+    @classmethod
+    def record(cls, booking, event_type):
+        event = cls.for_booking(booking, event_type)
+        event.save(using=booking._state.db)
+        return event
+
+    @classmethod
+    def for_booking(cls, booking, event_type):
+        return cls(
+            event_type=event_type,
+            booking_id=booking.pk,
+            owner_id=booking.owner_id,
+            payload={
+                'id': booking.pk,
+                'user': booking.user_id,
+                'vehicle': booking.vehicle_id,
+                'start_date': booking.start_date.isoformat(),
+                'end_date': booking.end_date.isoformat(),
+                'status': booking.status,
+                'deposit_amount': str(booking.deposit_amount),
+                'deposit_paid': booking.deposit_paid,
+            },
+        )
+
+    def as_message(self):
+        return {
+            'id': self.pk,
+            'type': self.event_type,
+            'created_at': self.created_at.isoformat(),
+            'booking': self.payload,
+        }
+
+    def __str__(self):
+        return f"{self.event_type} #{self.booking_id}"
+
+
+def generate_webhook_secret():
+    return secrets.token_hex(32)
+
+
+class WebhookEndpoint(models.Model):
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='webhook_endpoints', db_constraint=False)
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64, default=generate_webhook_secret)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Webhook endpoint'
+        verbose_name_plural = 'Webhook endpoints'
+
+    def __str__(self):
+        return f"{self.owner.username} -> {self.url}"
+
+
+class BookingHold(models.Model):
+    """Short-lived reservation taken before checkout; converts into a Booking on confirmation."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='booking_holds', db_constraint=False)
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='holds')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    expires_at = models.DateTimeField()
+    booking = models.OneToOneField(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='hold')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Booking hold'
+        verbose_name_plural = 'Booking holds'
+        indexes = [
+            models.Index(
+                fields=['vehicle', 'expires_at'],
+                name='bookinghold_active_idx',
+                condition=models.Q(booking__isnull=True),
+            ),
+            models.Index(fields=['expires_at'], name='bookinghold_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"Hold on {self.vehicle_id} ({self.start_date} to {self.end_date})"
+
+
+class BookingDailyRollup(models.Model):
+    """Bookings and deposits per start day, vehicle and status.
+
+    Kept exact by ``Booking.save``/``delete`` in the booking's transaction.
+    Archiving deletes through the queryset, so archived bookings keep
+    counting. ``rebuild_booking_rollups`` recomputes the table after bulk
+    loads.
+    """
+
+    day = models.DateField()
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='daily_rollups')
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='booking_rollups', db_constraint=False)
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    bookings = models.IntegerField(default=0)
+    deposit_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    deposit_paid_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['day', 'vehicle', 'status']
+        verbose_name = 'Booking daily rollup'
+        verbose_name_plural = 'Booking daily rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'vehicle', 'status'], name='booking_rollup_key'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'day'], name='booking_rollup_owner_day_idx'),
+        ]
+
+    @classmethod
+    def apply(cls, contributions, using=None):
+        """Add ``(Booking.rollup_values(), sign)`` pairs; ``None`` values are skipped."""
+        using = using or router.db_for_write(cls)
+        totals = {}
+        for values, sign in contributions:
+            if values is None:
+                continue
+            day, vehicle_id, owner_id, status, deposit_amount, deposit_paid = values
+            deposit = Decimal(str(deposit_amount)) * sign
+            key = (day, vehicle_id, status)
+            bookings, deposits, paid, _ = totals.get(key, (0, Decimal(0), Decimal(0), owner_id))
+            totals[key] = (bookings + sign, deposits + deposit, paid + (deposit if deposit_paid else 0), owner_id)
+
+        for (day, vehicle_id, status), (bookings, deposits, paid, owner_id) in totals.items():
+            if not (bookings or deposits or paid):
+                continue
+            rows = cls.objects.using(using).filter(day=day, vehicle_id=vehicle_id, status=status)
+            increments = {
+                'owner_id': owner_id,
+                'bookings': F('bookings') + bookings,
+                'deposit_amount': F('deposit_amount') + deposits,
+                'deposit_paid_amount': F('deposit_paid_amount') + paid,
+            }
+            if rows.update(**increments):
+                continue
+            try:
+                with transaction.atomic(using=using):
+                    cls.objects.using(using).create(
+                        day=day, vehicle_id=vehicle_id, owner_id=owner_id, status=status,
+                        bookings=bookings, deposit_amount=deposits, deposit_paid_amount=paid,
+                    )
+            except IntegrityError:
+                rows.update(**increments)
 
     def __str__(self):
-        return f"{self.user.username} - {self.vehicle} ({self.start_date} to {self.end_date})"
+        return f"{self.day} vehicle #{self.vehicle_id} {self.status}: {self.bookings}"
@@ -0,0 +1,74 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import router, transaction
+from django.db.models import Case, Count, DecimalField, F, Sum, Value, When
+from django.db.models.functions import TruncMonth
+from .models import ArchivedBooking, Booking, BookingDailyRollup
+
+
+def aggregate_bookings(booking_model, archived_model, using=None):
+    """Rollup totals keyed by ``(day, vehicle_id, status)`` from live and archived bookings.
+
+    Takes the models as arguments so the backfill migration can pass its
+    historical models.
+    """
+    paid = Sum(Case(
+        When(deposit_paid=True, then='deposit_amount'),
+        default=Value(0),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    ))
+    sources = (
+        booking_model.objects.using(using).values('start_date', 'vehicle_id', 'owner_id', 'status'),
+        archived_model.objects.using(using).values(
+            'start_date', 'vehicle_id', 'status', owner_id=F('vehicle__owner_id')
+        ),
+    )
+    totals = defaultdict(lambda: {'owner_id': None, 'bookings': 0, 'deposit_amount': Decimal(0), 'deposit_paid_amount': Decimal(0)})
+    for queryset in sources:
+        rows = queryset.order_by().annotate(count=Count('id'), deposits=Sum('deposit_amount'), paid=paid)
+        for row in rows.iterator():
+            total = totals[(row['start_date'], row['vehicle_id'], row['status'])]
+            total['owner_id'] = row['owner_id']
+            total['bookings'] += row['count']
+            total['deposit_amount'] += row['deposits'] or 0
+            total['deposit_paid_amount'] += row['paid'] or 0
+    return totals
+
+
+def rebuild_rollups(batch_size=5000):
+    """Recompute every rollup row on the current shard; returns the number of rows.
+
+    The old rows are deleted before aggregating, in the same transaction, so
+    booking writes racing the rebuild either committed before the aggregate
+    (and are counted by it) or wait on the deleted rows and apply their delta
+    on top of the new ones.
+    """
+    with transaction.atomic(using=router.db_for_write(BookingDailyRollup)):
+        BookingDailyRollup.objects.all().delete()
+        totals = aggregate_bookings(Booking, ArchivedBooking)
+        BookingDailyRollup.objects.bulk_create(
+            (
+                BookingDailyRollup(day=day, vehicle_id=vehicle_id, status=status, **total)
+                for (day, vehicle_id, status), total in totals.items()
+            ),
+            batch_size=batch_size,
+        )
+    return len(totals)
+
+
+def booking_report(queryset, period='month'):
+    """Sum rollup rows per period, vehicle and status."""
+    if period == 'month':
+        queryset = queryset.annotate(period=TruncMonth('day'))
+    else:
+        queryset = queryset.annotate(period=F('day'))
+    return (
+        queryset.exclude(bookings=0)
+        .values('period', 'vehicle_id', 'status')
+        .annotate(
+            bookings_count=Sum('bookings'),
+            deposits=Sum('deposit_amount'),
+            deposits_paid=Sum('deposit_paid_amount'),
+        )
+        .order_by('period', 'vehicle_id', 'status')
+    )
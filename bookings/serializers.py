@@ -1,16 +1,18 @@
 from rest_framework import serializers
-from .models import Booking
+from rental_backend.api_tracing import TracedValidationMixin
+from .models import ArchivedBooking, Booking, BookingHold, WebhookEndpoint
+from .payments import calculate_deposit
+from .webhooks import resolve_webhook_url
 from datetime import date
 
 
-class BookingSerializer(serializers.ModelSerializer):
-    user_username = serializers.CharField(source='user.username', read_only=True)
+class BookingSerializer(TracedValidationMixin, serializers.ModelSerializer):
     vehicle_details = serializers.SerializerMethodField()
 
     class Meta:
         model = Booking
         fields = (
-            'id', 'user', 'user_username', 'vehicle', 'vehicle_details',
+            'id', 'user', 'user_username', 'vehicle', 'vehicle_details', 'city',
             'start_date', 'end_date', 'status', 'deposit_amount',
             'deposit_paid', 'created_at', 'updated_at'
         )
@@ -18,11 +20,11 @@ class BookingSerializer(serializers.ModelSerializer):
 
     def get_vehicle_details(self, obj):
         return {
-            'id': obj.vehicle.id,
-            'make': obj.vehicle.make,
-            'model': obj.vehicle.model,
-            'year': obj.vehicle.year,
-            'plate': obj.vehicle.plate,
+            'id': obj.vehicle_id,
+            'make': obj.vehicle_make,
+            'model': obj.vehicle_model,
+            'year': obj.vehicle_year,
+            'plate': obj.vehicle_plate,
         }
 
     def validate_start_date(self, value):
@@ -33,29 +35,14 @@ class BookingSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         start_date = attrs.get('start_date')
         end_date = attrs.get('end_date')
-        vehicle = attrs.get('vehicle')
-
-        if start_date and end_date:
-            if end_date < start_date:
-                raise serializers.ValidationError({"end_date": "End date must be after start date."})
 
-            if vehicle:
-                overlapping = Booking.objects.filter(
-                    vehicle=vehicle,
-                    status__in=['pending', 'confirmed'],
-                    start_date__lte=end_date,
-                    end_date__gte=start_date
-                ).exclude(pk=self.instance.pk if self.instance else None)
-
-                if overlapping.exists():
-                    raise serializers.ValidationError(
-                        "This vehicle is already booked for the selected dates."
-                    )
+        if start_date and end_date and end_date < start_date:
+            raise serializers.ValidationError({"end_date": "End date must be after start date."})
 
         return attrs
 
 
-class BookingCreateSerializer(serializers.ModelSerializer):
+class BookingCreateSerializer(TracedValidationMixin, serializers.ModelSerializer):
     class Meta:
         model = Booking
         fields = ('vehicle', 'start_date', 'end_date')
@@ -68,24 +55,94 @@ class BookingCreateSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         start_date = attrs.get('start_date')
         end_date = attrs.get('end_date')
-        vehicle = attrs.get('vehicle')
 
-        if start_date and end_date:
-            if end_date < start_date:
-                raise serializers.ValidationError({"end_date": "End date must be after start date."})
+        if start_date and end_date and end_date < start_date:
+            raise serializers.ValidationError({"end_date": "End date must be after start date."})
+
+        return attrs
+
+
+class ArchivedBookingSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='original_id', read_only=True)
+    user_username = serializers.CharField(source='user.username', read_only=True)
+    vehicle_details = serializers.SerializerMethodField()
+    archived = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedBooking
+        fields = (
+            'id', 'user', 'user_username', 'vehicle', 'vehicle_details', 'city',
+            'start_date', 'end_date', 'status', 'deposit_amount',
+            'deposit_paid', 'created_at', 'updated_at', 'archived'
+        )
+        read_only_fields = fields
+
+    def get_vehicle_details(self, obj):
+        return {
+            'id': obj.vehicle.id,
+            'make': obj.vehicle.make,
+            'model': obj.vehicle.model,
+            'year': obj.vehicle.year,
+            'plate': obj.vehicle.plate,
+        }
+
+    def get_archived(self, obj):
+        return True
+
+
+class WebhookEndpointSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookEndpoint
+        fields = ('id', 'url', 'secret', 'is_active', 'created_at')
+        read_only_fields = ('secret', 'created_at')
+
+    def validate_url(self, value):
+        try:
+            resolve_webhook_url(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+        return value
+
 
-            if vehicle:
-                overlapping = Booking.objects.filter(
-                    vehicle=vehicle,
-                    status__in=['pending', 'confirmed'],
-                    start_date__lte=end_date,
-                    end_date__gte=start_date
-                )
+class BookingBatchItemSerializer(serializers.Serializer):
+    vehicle = serializers.IntegerField(min_value=1)
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
 
-                if overlapping.exists():
-                    raise serializers.ValidationError(
-                        "This vehicle is already booked for the selected dates."
-                    )
+    def validate_start_date(self, value):
+        if value < date.today():
+            raise serializers.ValidationError("Start date cannot be in the past.")
+        return value
+
+    def validate(self, attrs):
+        if attrs['end_date'] < attrs['start_date']:
+            raise serializers.ValidationError({"end_date": "End date must be after start date."})
+        return attrs
 
+
+class BookingBatchSerializer(serializers.Serializer):
+    items = serializers.ListField(child=BookingBatchItemSerializer(), min_length=1, max_length=100)
+    reserve = serializers.BooleanField(default=False)
+
+
+class BookingHoldSerializer(serializers.ModelSerializer):
+    deposit_amount = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BookingHold
+        fields = ('id', 'vehicle', 'start_date', 'end_date', 'expires_at', 'booking', 'deposit_amount', 'created_at')
+        read_only_fields = ('expires_at', 'booking', 'created_at')
+
+    def get_deposit_amount(self, obj):
+        return f'{calculate_deposit(obj.start_date, obj.end_date):.2f}'
+
+    def validate_start_date(self, value):
+        if value < date.today():
+            raise serializers.ValidationError("Start date cannot be in the past.")
+        return value
+
+    def validate(self, attrs):
+        if attrs['end_date'] < attrs['start_date']:
+            raise serializers.ValidationError({"end_date": "End date must be after start date."})
         return attrs
 
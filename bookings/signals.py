@@ -0,0 +1,71 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, pre_delete
+from django.db import transaction
+from django.dispatch import receiver
+from rental_backend.sharding import current_shard, fan_out
+from vehicles.models import Vehicle
+from .models import ArchivedBooking, Booking, BookingDailyRollup, BookingEvent, BookingHold, WebhookEndpoint
+
+
+SNAPSHOT_SOURCE_FIELDS = ('make', 'model', 'year', 'plate')
+
+
+@receiver(post_save, sender=Vehicle)
+def sync_booking_owner(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    # Vehicles saved without edits to these fields (e.g. timestamp touches)
+    # don't rewrite their bookings.
+    changed = instance.changed_fields(['owner_id', *SNAPSHOT_SOURCE_FIELDS]) & instance.saved_attnames(update_fields)
+    if 'owner_id' in changed:
+        Booking.objects.filter(vehicle=instance).exclude(owner_id=instance.owner_id).update(owner_id=instance.owner_id)
+        BookingDailyRollup.objects.filter(vehicle=instance).exclude(owner_id=instance.owner_id).update(
+            owner_id=instance.owner_id
+        )
+    if changed & set(SNAPSHOT_SOURCE_FIELDS):
+        # Finished bookings keep the vehicle details they were made with.
+        Booking.objects.filter(vehicle=instance, status__in=Booking.ACTIVE_STATUSES).update(
+            **Booking.vehicle_snapshot(instance)
+        )
+
+
+def _drop_renter_from_rollups(user, using):
+    # Deleting the renter's bookings never calls Booking.delete, so take
+    # their live and archived bookings out of the rollups first.
+    live = (
+        Booking.objects.using(using).select_for_update()
+        .filter(user=user).values_list(*Booking.ROLLUP_FIELDS)
+    )
+    archived = ArchivedBooking.objects.using(using).filter(user=user).values_list(
+        'start_date', 'vehicle_id', 'vehicle__owner_id', 'status', 'deposit_amount', 'deposit_paid'
+    )
+    BookingDailyRollup.apply([(values, -1) for values in [*live, *archived]], using=using)
+
+
+def _delete_user_rows(user, using):
+    # Vehicles go first: their cascade takes other renters' bookings, holds
+    # and archives on those vehicles, and the vehicles' rollup rows.
+    Vehicle.objects.using(using).filter(owner=user).delete()
+    for model, field in ((Booking, 'user'), (ArchivedBooking, 'user'), (BookingHold, 'user'),
+                         (BookingEvent, 'owner'), (WebhookEndpoint, 'owner'), (BookingDailyRollup, 'owner')):
+        model.objects.using(using).filter(**{field: user}).delete()
+
+
+@receiver(pre_delete, sender=User)
+def delete_user_from_shards(sender, instance, using, **kwargs):
+    """Remove a deleted user's city-sharded rows on every shard.
+
+    Sharded rows reference users without a database constraint, and the ORM
+    cascade only reaches ``using``. There this only fixes up the rollups and
+    the cascade does the rest; every other shard is cleaned here, each in
+    its own transaction, so a failed user delete can leave those shards
+    already cleaned.
+    """
+    def clean_shard():
+        alias = current_shard()
+        with transaction.atomic(using=alias):
+            _drop_renter_from_rollups(instance, alias)
+            if alias != using:
+                _delete_user_rows(instance, alias)
+
+    fan_out(clean_shard)
@@ -0,0 +1,69 @@
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rental_backend.sharding import current_shard
+from .models import BookingEvent
+from .webhooks import webhook_settings
+
+
+def format_event(event):
+    return (
+        f'id: {event.pk}\n'
+        f'event: {event.event_type}\n'
+        f'data: {json.dumps(event.as_message())}\n\n'
+    )
+
+
+async def event_stream(owner_id, last_id, poll_interval, keepalive, using=None):
+    idle = 0.0
+    while True:
+        events = [
+            event async for event in
+            BookingEvent.objects.using(using).filter(owner_id=owner_id, id__gt=last_id).order_by('id')[:100]
+        ]
+        for event in events:
+            last_id = event.pk
+            yield format_event(event)
+        if events:
+            idle = 0.0
+            continue
+        if idle >= keepalive:
+            idle = 0.0
+            yield ': keepalive\n\n'
+        await asyncio.sleep(poll_interval)
+        idle += poll_interval
+
+
+async def booking_event_stream(request):
+    """Server-sent events for bookings on the authenticated owner's vehicles.
+
+    Resumes after the ``Last-Event-ID`` header when the client reconnects,
+    otherwise starts from the newest event. Streams the request city's shard.
+    """
+    try:
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({'detail': str(e.detail)}, status=401)
+    if result is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    user = result[0]
+    shard = current_shard()
+
+    last_id = request.headers.get('Last-Event-ID')
+    if last_id and last_id.isdigit():
+        last_id = int(last_id)
+    else:
+        latest = await BookingEvent.objects.using(shard).filter(owner_id=user.pk).order_by('-id').afirst()
+        last_id = latest.pk if latest else 0
+
+    config = webhook_settings()
+    response = StreamingHttpResponse(
+        event_stream(user.pk, last_id, config['SSE_POLL_INTERVAL'], config['SSE_KEEPALIVE'], using=shard),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
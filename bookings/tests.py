@@ -1,11 +1,36 @@
-from django.test import TestCase
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection, models
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from datetime import date, timedelta
+from decimal import Decimal
+from rental_backend.idempotency import check_cache_backend
+from rental_backend.middleware import AdmissionControlMiddleware
+from rental_backend.throttling import SlidingWindowThrottle, check_throttle_cache
 from vehicles.models import Vehicle
-from .models import Booking
+from . import holds
+from .archive import archive_bookings
+from .filters import filter_bookings
+from .models import ArchivedBooking, Booking, BookingDailyRollup, BookingEvent, BookingHold, WebhookEndpoint
+from .rollups import aggregate_bookings
+from .streams import event_stream
+from .views import BookingViewSet
+from .webhooks import dispatch_pending_events, sign
 
 
 class BookingTests(TestCase):
@@ -168,3 +193,885 @@ class BookingTests(TestCase):
         }
         response = self.client.post(self.bookings_url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class BookingAdminTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username='admin', password='adminpass123')
+        self.client.force_login(self.admin_user)
+        self.changelist_url = '/admin/bookings/booking/'
+        self.vehicle = Vehicle.objects.create(
+            owner=self.admin_user,
+            make='Toyota',
+            model='Corolla',
+            year=2020,
+            plate='LHR-123'
+        )
+
+    def _create_bookings(self, count):
+        start_date = date.today() + timedelta(days=1)
+        for _ in range(count):
+            renter = User.objects.create_user(username=f'renter{Booking.objects.count()}', password='testpass123')
+            Booking.objects.create(
+                user=renter,
+                vehicle=self.vehicle,
+                start_date=start_date,
+                end_date=start_date,
+                status='cancelled'
+            )
+
+    def _changelist_query_count(self, params=''):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'{self.changelist_url}{params}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries)
+
+    def test_changelist_query_count_does_not_grow_with_rows(self):
+        """Test that the booking changelist does not fetch user/vehicle per row"""
+        self._create_bookings(2)
+        baseline = self._changelist_query_count()
+        self._create_bookings(8)
+        self.assertEqual(self._changelist_query_count(), baseline)
+
+    def test_changelist_search(self):
+        """Test prefix search on the booking changelist"""
+        self._create_bookings(2)
+        response = self.client.get(f'{self.changelist_url}?q=renter1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+
+class BookingArchiveTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.token = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token.access_token}')
+        self.vehicle = Vehicle.objects.create(
+            owner=self.user,
+            make='Toyota',
+            model='Corolla',
+            year=2020,
+            plate='LHR-123'
+        )
+        old_start = date.today() - timedelta(days=200)
+        self.old_completed = Booking.objects.create(
+            user=self.user, vehicle=self.vehicle, start_date=old_start,
+            end_date=old_start + timedelta(days=2), status='completed'
+        )
+        self.old_cancelled = Booking.objects.create(
+            user=self.user, vehicle=self.vehicle, start_date=old_start + timedelta(days=10),
+            end_date=old_start + timedelta(days=12), status='cancelled'
+        )
+        self.old_confirmed = Booking.objects.create(
+            user=self.user, vehicle=self.vehicle, start_date=old_start + timedelta(days=20),
+            end_date=old_start + timedelta(days=22), status='confirmed'
+        )
+        self.upcoming = Booking.objects.create(
+            user=self.user, vehicle=self.vehicle, start_date=date.today() + timedelta(days=1),
+            end_date=date.today() + timedelta(days=3)
+        )
+
+    def test_archive_command_moves_old_terminal_bookings(self):
+        """Test that only old completed/cancelled bookings are archived, in batches"""
+        out = StringIO()
+        call_command('archive_bookings', '--older-than-days=30', '--batch-size=1', stdout=out)
+        self.assertIn('Archived 2 bookings', out.getvalue())
+        self.assertEqual(
+            set(Booking.objects.values_list('pk', flat=True)),
+            {self.old_confirmed.pk, self.upcoming.pk}
+        )
+        self.assertEqual(
+            set(ArchivedBooking.objects.values_list('original_id', flat=True)),
+            {self.old_completed.pk, self.old_cancelled.pk}
+        )
+
+    def test_history_includes_archived_bookings(self):
+        """Test that the history endpoint merges live and archived bookings"""
+        archive_bookings(older_than_days=30)
+        response = self.client.get('/api/bookings/history/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 4)
+        archived_ids = {item['id'] for item in response.data['results'] if item['archived']}
+        self.assertEqual(archived_ids, {self.old_completed.pk, self.old_cancelled.pk})
+
+        list_response = self.client.get('/api/bookings/')
+        self.assertEqual(list_response.data['count'], 2)
+
+    def test_history_is_paged(self):
+        """Test that history returns at most `limit` rows and pages back with `before`"""
+        # Rows sharing a timestamp across the page boundary must not be skipped.
+        Booking.objects.update(created_at=timezone.now())
+        archive_bookings(older_than_days=30)
+        first = self.client.get('/api/bookings/history/?limit=3')
+        self.assertEqual(first.data['count'], 3)
+        self.assertIsNotNone(first.data['next_before'])
+        rest = self.client.get('/api/bookings/history/', {'limit': 3, 'before': first.data['next_before']})
+        self.assertEqual(rest.data['count'], 1)
+        self.assertIsNone(rest.data['next_before'])
+        self.assertFalse(
+            {item['id'] for item in first.data['results']} & {item['id'] for item in rest.data['results']}
+        )
+        self.assertEqual(self.client.get('/api/bookings/history/?limit=1000').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/bookings/history/?before=yesterday').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookingThrottleTests(TestCase):
+    def setUp(self):
+        caches[settings.THROTTLE_CACHE].clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.token = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token.access_token}')
+        self.vehicle = Vehicle.objects.create(
+            owner=self.user,
+            make='Toyota',
+            model='Corolla',
+            year=2020,
+            plate='LHR-123'
+        )
+
+    def tearDown(self):
+        caches[settings.THROTTLE_CACHE].clear()
+
+    def _post_booking(self, offset):
+        start_date = date.today() + timedelta(days=offset)
+        return self.client.post('/api/bookings/', {
+            'vehicle': self.vehicle.id,
+            'start_date': str(start_date),
+            'end_date': str(start_date)
+        }, format='json')
+
+    def test_booking_create_endpoint_throttled(self):
+        """Test that the booking create endpoint budget returns 429 when exhausted"""
+        rest_framework = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'booking.create': '2/min'}}
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            self.assertEqual(self._post_booking(1).status_code, status.HTTP_201_CREATED)
+            self.assertEqual(self._post_booking(3).status_code, status.HTTP_201_CREATED)
+            response = self._post_booking(5)
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertIn('Retry-After', response)
+            # Other endpoints have their own budget
+            self.assertEqual(self.client.get('/api/bookings/').status_code, status.HTTP_200_OK)
+
+    def test_endpoint_budget_is_per_client(self):
+        """Test that one client exhausting an endpoint budget does not throttle other clients"""
+        other = User.objects.create_user(username='other', password='testpass123')
+        other_client = APIClient()
+        other_client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(other).access_token}')
+        rest_framework = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'booking.list': '1/min'}}
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            self.assertEqual(self.client.get('/api/bookings/').status_code, status.HTTP_200_OK)
+            self.assertEqual(self.client.get('/api/bookings/').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(other_client.get('/api/bookings/').status_code, status.HTTP_200_OK)
+
+    def test_user_window_slides(self):
+        """Test that the per-user budget frees up as the window slides"""
+        rest_framework = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'user': '2/min'}}
+        with override_settings(REST_FRAMEWORK=rest_framework), \
+                mock.patch.object(SlidingWindowThrottle, 'timer', return_value=1000.0) as timer:
+            self.assertEqual(self.client.get('/api/bookings/').status_code, status.HTTP_200_OK)
+            self.assertEqual(self.client.get('/api/bookings/').status_code, status.HTTP_200_OK)
+            response = self.client.get('/api/bookings/')
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(response['Retry-After'], '20')
+            timer.return_value = 1030.0
+            self.assertEqual(self.client.get('/api/bookings/').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            timer.return_value = 1061.0
+            self.assertEqual(self.client.get('/api/bookings/').status_code, status.HTTP_200_OK)
+
+    def test_process_local_throttle_cache_is_rejected(self):
+        """Test that a local-memory throttle cache fails the startup check"""
+        caches_setting = {**settings.CACHES, 'throttle': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=caches_setting), self.assertRaises(ImproperlyConfigured):
+            check_throttle_cache()
+
+    def test_overload_sheds_reads_before_writes(self):
+        """Test that admission control rejects GETs first under load"""
+        middleware = AdmissionControlMiddleware(lambda request: HttpResponse('ok'))
+        middleware.in_flight = 40
+        factory = RequestFactory()
+        with override_settings(ADMISSION_CONTROL={'SHED_READS_ABOVE': 32, 'MAX_IN_FLIGHT': 64}):
+            response = middleware(factory.get('/api/bookings/'))
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(response['Retry-After'], '1')
+            self.assertEqual(middleware(factory.post('/api/bookings/')).status_code, status.HTTP_200_OK)
+            middleware.in_flight = 70
+            self.assertEqual(middleware(factory.post('/api/bookings/')).status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(middleware.in_flight, 70)
+
+
+class WebhookReceiver(BaseHTTPRequestHandler):
+    status_code = 200
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        type(self).received.append((self.headers['X-Rental-Signature'], body))
+        self.send_response(type(self).status_code)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(WEBHOOKS={**settings.WEBHOOKS, 'ALLOW_LOCAL_URLS': True})
+class BookingEventTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = HTTPServer(('127.0.0.1', 0), WebhookReceiver)
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        WebhookReceiver.received = []
+        WebhookReceiver.status_code = 200
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.renter = User.objects.create_user(username='renter', password='testpass123')
+        self.vehicle = Vehicle.objects.create(
+            owner=self.owner,
+            make='Toyota',
+            model='Corolla',
+            year=2020,
+            plate='LHR-123'
+        )
+        self.endpoint = WebhookEndpoint.objects.create(
+            owner=self.owner,
+            url=f'http://127.0.0.1:{self.server.server_port}/hook'
+        )
+        self.start_date = date.today() + timedelta(days=1)
+
+    def _create_booking(self):
+        return Booking.objects.create(
+            user=self.renter,
+            vehicle=self.vehicle,
+            start_date=self.start_date,
+            end_date=self.start_date + timedelta(days=2)
+        )
+
+    def test_outbox_written_on_create_and_status_change(self):
+        """Test that booking creation and status changes write outbox events"""
+        booking = self._create_booking()
+        booking.deposit_paid = True
+        booking.save()
+        booking = Booking.objects.get(pk=booking.pk)
+        booking.status = 'confirmed'
+        booking.save()
+        events = list(BookingEvent.objects.values_list('event_type', 'owner_id', 'booking_id'))
+        self.assertEqual(events, [
+            ('booking.created', self.owner.pk, booking.pk),
+            ('booking.status_changed', self.owner.pk, booking.pk),
+        ])
+        self.assertEqual(BookingEvent.objects.last().payload['status'], 'confirmed')
+
+    def test_dispatcher_batches_signed_webhooks(self):
+        """Test that pending events are delivered in one signed POST per endpoint"""
+        self._create_booking()
+        booking = self._create_booking()
+        booking.status = 'cancelled'
+        booking.save()
+        self.assertEqual(dispatch_pending_events(), 3)
+        self.assertEqual(len(WebhookReceiver.received), 1)
+        signature, body = WebhookReceiver.received[0]
+        self.assertEqual(signature, f'sha256={sign(self.endpoint.secret, body)}')
+        self.assertEqual(len(json.loads(body)['events']), 3)
+        self.assertFalse(BookingEvent.objects.filter(delivered_at__isnull=True).exists())
+        self.assertEqual(dispatch_pending_events(), 0)
+
+    def test_dispatcher_retries_with_backoff(self):
+        """Test that failed deliveries are retried later"""
+        self._create_booking()
+        WebhookReceiver.status_code = 500
+        self.assertEqual(dispatch_pending_events(), 0)
+        event = BookingEvent.objects.get()
+        self.assertEqual(event.attempts, 1)
+        self.assertIsNone(event.delivered_at)
+        self.assertGreater(event.next_attempt_at, timezone.now())
+
+        BookingEvent.objects.update(next_attempt_at=timezone.now())
+        WebhookReceiver.status_code = 200
+        self.assertEqual(dispatch_pending_events(), 1)
+
+    def test_local_webhook_urls_are_refused(self):
+        """Test that endpoints must be https on public addresses, both at registration and delivery"""
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        with override_settings(WEBHOOKS={**settings.WEBHOOKS, 'ALLOW_LOCAL_URLS': False}):
+            for url in ('http://example.com/hook', 'https://127.0.0.1/hook', 'https://169.254.169.254/latest',
+                        'https://10.0.0.1/hook', 'https://[::ffff:192.168.0.1]/hook'):
+                response = client.post('/api/webhooks/', {'url': url}, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, url)
+
+            self._create_booking()
+            self.assertEqual(dispatch_pending_events(), 0)
+        self.assertEqual(WebhookReceiver.received, [])
+        self.assertEqual(BookingEvent.objects.get().attempts, 1)
+
+    def test_prune_drops_old_delivered_events(self):
+        """Test that delivered events are deleted once past the retention period"""
+        self._create_booking()
+        self._create_booking()
+        self.assertEqual(dispatch_pending_events(), 2)
+        old, recent = BookingEvent.objects.order_by('id')
+        BookingEvent.objects.filter(pk=old.pk).update(delivered_at=timezone.now() - timedelta(days=8))
+        self._create_booking()
+
+        out = StringIO()
+        call_command('prune_booking_events', stdout=out)
+        self.assertIn('Pruned 1 delivered events', out.getvalue())
+        self.assertEqual(BookingEvent.objects.count(), 2)
+        self.assertTrue(BookingEvent.objects.filter(pk=recent.pk).exists())
+
+    def test_event_stream_yields_new_events(self):
+        """Test that the SSE stream pushes events created after the cursor"""
+        booking = self._create_booking()
+
+        async def first_chunk():
+            stream = event_stream(self.owner.pk, 0, poll_interval=0.01, keepalive=60)
+            try:
+                return await stream.__anext__()
+            finally:
+                await stream.aclose()
+
+        chunk = async_to_sync(first_chunk)()
+        self.assertIn('event: booking.created', chunk)
+        self.assertIn(f'"id": {booking.pk}', chunk)
+
+    def test_event_stream_requires_authentication(self):
+        """Test that the SSE endpoint rejects anonymous clients"""
+        response = self.client.get('/api/bookings/events/stream/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class OwnerInboxTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.renter = User.objects.create_user(username='renter', password='testpass123')
+        self.token = RefreshToken.for_user(self.owner)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token.access_token}')
+        self.inbox_url = '/api/bookings/inbox/'
+        self.vehicle = Vehicle.objects.create(owner=self.owner, make='Toyota', model='Corolla', year=2020, plate='LHR-123')
+        other_owner = User.objects.create_user(username='other', password='testpass123')
+        self.other_vehicle = Vehicle.objects.create(owner=other_owner, make='Honda', model='Civic', year=2021, plate='LHR-456')
+        start_date = date.today() + timedelta(days=1)
+        self.pending = Booking.objects.create(
+            user=self.renter, vehicle=self.vehicle, start_date=start_date, end_date=start_date + timedelta(days=1)
+        )
+        self.confirmed = Booking.objects.create(
+            user=self.renter, vehicle=self.vehicle, start_date=start_date + timedelta(days=5),
+            end_date=start_date + timedelta(days=6), status='confirmed'
+        )
+        Booking.objects.create(
+            user=self.renter, vehicle=self.other_vehicle, start_date=start_date, end_date=start_date
+        )
+
+    def test_inbox_lists_bookings_on_owned_vehicles(self):
+        """Test that owners see bookings on their vehicles only"""
+        response = self.client.get(self.inbox_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({item['id'] for item in response.data['results']}, {self.pending.pk, self.confirmed.pk})
+
+        response = self.client.get(f'{self.inbox_url}?status=confirmed')
+        self.assertEqual([item['id'] for item in response.data['results']], [self.confirmed.pk])
+
+    def test_inbox_is_paged(self):
+        """Test that the inbox pages newest first with the history's limit and cursor"""
+        Booking.objects.filter(owner=self.owner).update(created_at=timezone.now())
+        first = self.client.get(f'{self.inbox_url}?limit=1').data
+        self.assertEqual(first['count'], 1)
+        self.assertEqual([item['id'] for item in first['results']], [self.confirmed.pk])
+
+        second = self.client.get(self.inbox_url, {'limit': 1, 'before': first['next_before']}).data
+        self.assertEqual([item['id'] for item in second['results']], [self.pending.pk])
+        self.assertEqual(self.client.get(f'{self.inbox_url}?limit=500').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_owner_follows_vehicle_transfer(self):
+        """Test that the denormalized owner is updated when a vehicle changes hands"""
+        self.vehicle.owner = self.renter
+        self.vehicle.save()
+        self.assertEqual(self.client.get(self.inbox_url).data['count'], 0)
+        self.assertEqual(Booking.objects.filter(owner=self.renter).count(), 2)
+
+    def test_vehicle_snapshot_follows_edits_on_active_bookings(self):
+        """Test that vehicle edits reach active bookings while finished ones keep their snapshot"""
+        completed = Booking.objects.create(
+            user=self.renter, vehicle=self.vehicle, start_date=date.today() - timedelta(days=10),
+            end_date=date.today() - timedelta(days=8), status='completed'
+        )
+        response = self.client.put(
+            f'/api/vehicles/{self.vehicle.pk}/',
+            {'make': 'Toyota', 'model': 'Corolla', 'year': 2020, 'plate': 'LHR-999'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.pending.refresh_from_db()
+        completed.refresh_from_db()
+        self.assertEqual(self.pending.vehicle_plate, 'LHR-999')
+        self.assertEqual(completed.vehicle_plate, 'LHR-123')
+        self.assertEqual(completed.user_username, 'renter')
+
+    def test_snapshot_follows_booking_to_another_vehicle(self):
+        """Test that moving a booking to another vehicle refreshes its vehicle details"""
+        self.pending.vehicle = self.other_vehicle
+        self.pending.save()
+        self.pending.refresh_from_db()
+        self.assertEqual((self.pending.vehicle_make, self.pending.vehicle_plate), ('Honda', 'LHR-456'))
+
+        self.pending.vehicle = self.vehicle
+        self.pending.save(update_fields=['vehicle'])
+        self.pending.refresh_from_db()
+        self.assertEqual((self.pending.vehicle_make, self.pending.vehicle_plate), ('Toyota', 'LHR-123'))
+
+    def test_unchanged_vehicle_save_does_not_rewrite_bookings(self):
+        """Test that saving a vehicle without changing its details issues no booking updates"""
+        vehicle = Vehicle.objects.get(pk=self.vehicle.pk)
+        with CaptureQueriesContext(connection) as queries:
+            vehicle.save()
+            vehicle.year = 2021
+            vehicle.save(update_fields=['updated_at'])
+        self.assertFalse(any('bookings_booking' in query['sql'] for query in queries.captured_queries))
+
+        vehicle.save(update_fields=['year'])
+        self.pending.refresh_from_db()
+        self.assertEqual(self.pending.vehicle_year, 2021)
+
+    def test_inbox_reads_a_single_table(self):
+        """Test that booking lists are served from the booking snapshot without joins"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.inbox_url)
+        item = next(item for item in response.data['results'] if item['id'] == self.pending.pk)
+        self.assertEqual(item['user_username'], 'renter')
+        self.assertEqual(item['vehicle_details']['plate'], 'LHR-123')
+        booking_queries = [query['sql'] for query in queries.captured_queries if 'bookings_booking' in query['sql']]
+        self.assertEqual(len(booking_queries), 1)
+        self.assertNotIn('JOIN', booking_queries[0])
+
+
+class BookingFilterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.token = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token.access_token}')
+        self.bookings_url = '/api/bookings/'
+        self.vehicle = Vehicle.objects.create(owner=self.user, make='Toyota', model='Corolla', year=2020, plate='LHR-123')
+        self.window_start = date.today() + timedelta(days=10)
+        self.window_end = self.window_start + timedelta(days=4)
+        self.straddling = Booking.objects.create(
+            user=self.user, vehicle=self.vehicle,
+            start_date=self.window_start - timedelta(days=2), end_date=self.window_start
+        )
+        self.inside = Booking.objects.create(
+            user=self.user, vehicle=self.vehicle,
+            start_date=self.window_start + timedelta(days=1), end_date=self.window_start + timedelta(days=2),
+            status='confirmed'
+        )
+        self.after = Booking.objects.create(
+            user=self.user, vehicle=self.vehicle,
+            start_date=self.window_end + timedelta(days=1), end_date=self.window_end + timedelta(days=3)
+        )
+
+    def test_date_window_uses_overlap_semantics(self):
+        """Test that bookings touching the window are returned"""
+        response = self.client.get(f'{self.bookings_url}?from={self.window_start}&to={self.window_end}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({item['id'] for item in response.data['results']}, {self.straddling.pk, self.inside.pk})
+
+    def test_invalid_filters_return_400(self):
+        """Test that malformed dates, reversed ranges and unknown statuses are rejected"""
+        for query in ('from=not-a-date', 'to=2024-13-01', f'from={self.window_end}&to={self.window_start}', 'status=bogus'):
+            response = self.client.get(f'{self.bookings_url}?{query}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
+
+    def test_filtered_list_uses_composite_index(self):
+        """Test that user/status lists are served by the composite indexes"""
+        queryset = filter_bookings(Booking.objects.filter(user=self.user), {'status': 'confirmed'})
+        self.assertIn('booking_user_status_idx', queryset.explain())
+        queryset = filter_bookings(Booking.objects.filter(owner=self.user), {'status': 'confirmed'})
+        self.assertIn('booking_owner_status_idx', queryset.explain())
+        queryset = filter_bookings(Booking.objects.filter(user=self.user), {})
+        self.assertIn('booking_user_created_idx', queryset.explain())
+
+    def test_date_window_uses_start_date_index(self):
+        """Test that from/to windows are served by the (user|owner, start_date, end_date) indexes"""
+        window = {'from': str(self.window_start), 'to': str(self.window_end)}
+        queryset = filter_bookings(Booking.objects.filter(user=self.user), window)
+        self.assertIn('booking_user_start_idx', queryset.explain())
+        queryset = filter_bookings(Booking.objects.filter(owner=self.user), window)
+        self.assertIn('booking_owner_start_idx', queryset.explain())
+
+
+class BookingBatchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='agent', password='testpass123')
+        self.token = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token.access_token}')
+        self.batch_url = '/api/bookings/batch/'
+        owner = User.objects.create_user(username='owner', password='testpass123')
+        self.corolla = Vehicle.objects.create(owner=owner, make='Toyota', model='Corolla', year=2020, plate='LHR-123')
+        self.civic = Vehicle.objects.create(owner=owner, make='Honda', model='Civic', year=2021, plate='LHR-456')
+        self.start = date.today() + timedelta(days=5)
+        Booking.objects.create(
+            user=owner, vehicle=self.corolla, start_date=self.start, end_date=self.start + timedelta(days=2),
+            status='confirmed'
+        )
+
+    def _items(self):
+        return [
+            {'vehicle': self.corolla.id, 'start_date': str(self.start + timedelta(days=1)), 'end_date': str(self.start + timedelta(days=3))},
+            {'vehicle': self.corolla.id, 'start_date': str(self.start + timedelta(days=3)), 'end_date': str(self.start + timedelta(days=4))},
+            {'vehicle': self.civic.id, 'start_date': str(self.start), 'end_date': str(self.start + timedelta(days=4))},
+            {'vehicle': self.civic.id, 'start_date': str(self.start + timedelta(days=2)), 'end_date': str(self.start + timedelta(days=2))},
+            {'vehicle': 999999, 'start_date': str(self.start), 'end_date': str(self.start)},
+        ]
+
+    def test_batch_check_uses_single_overlap_query(self):
+        """Test per-tuple availability and deposits with one booking query"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.batch_url, {'items': self._items()}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['available'] for result in response.data['results']], [False, True, True, True, False])
+        self.assertEqual(response.data['results'][2]['deposit_amount'], '50.00')
+        booking_queries = [q for q in ctx.captured_queries if 'FROM "bookings_booking"' in q['sql']]
+        self.assertEqual(len(booking_queries), 1)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_batch_reserve_books_available_subset(self):
+        """Test that reserving books available tuples without clashing within the batch"""
+        response = self.client.post(self.batch_url, {'items': self._items(), 'reserve': True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['available'] for result in response.data['results']], [False, True, True, False, False])
+        self.assertEqual(response.data['reserved'], 2)
+        reserved = Booking.objects.filter(user=self.user)
+        self.assertEqual(reserved.count(), 2)
+        self.assertTrue(all(booking.owner_id == self.corolla.owner_id for booking in reserved))
+        self.assertEqual(BookingEvent.objects.filter(booking_id__in=reserved.values('pk')).count(), 2)
+
+    def test_batch_rejects_invalid_items(self):
+        """Test that malformed batches are rejected"""
+        items = [{'vehicle': self.corolla.id, 'start_date': str(self.start + timedelta(days=2)), 'end_date': str(self.start)}]
+        response = self.client.post(self.batch_url, {'items': items}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.batch_url, {'items': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookingHoldTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        caches[settings.THROTTLE_CACHE].clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='holder', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.token = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token.access_token}')
+        self.other_client = APIClient()
+        self.other_client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.other).access_token}')
+        self.holds_url = '/api/holds/'
+        self.vehicle = Vehicle.objects.create(owner=self.other, make='Toyota', model='Corolla', year=2020, plate='LHR-123')
+        self.start_date = date.today() + timedelta(days=1)
+        self.data = {
+            'vehicle': self.vehicle.id,
+            'start_date': str(self.start_date),
+            'end_date': str(self.start_date + timedelta(days=2))
+        }
+
+    def tearDown(self):
+        caches[settings.THROTTLE_CACHE].clear()
+
+    def test_hold_blocks_other_users(self):
+        """Test that a hold makes the dates unavailable to other users only"""
+        response = self.client.post(self.holds_url, self.data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNotNone(response.data['expires_at'])
+
+        response = self.other_client.post('/api/bookings/', self.data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.other_client.post(self.holds_url, self.data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.other_client.post('/api/bookings/batch/', {'items': [self.data]}, format='json')
+        self.assertFalse(response.data['results'][0]['available'])
+
+    def test_booking_checks_holds_only_under_vehicle_lock(self):
+        """Test that held dates are rejected by the locked check, not by an unlocked serializer pre-check"""
+        self.client.post(self.holds_url, self.data, format='json')
+        with mock.patch('bookings.views.lock_dates', wraps=holds.lock_dates) as lock_dates:
+            response = self.other_client.post('/api/bookings/', self.data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['non_field_errors'], [holds.HOLD_CONFLICT_MESSAGE])
+        lock_dates.assert_called_once()
+        self.assertFalse(Booking.objects.exists())
+
+    @override_settings(BOOKING_HOLD_MAX_PER_USER=1)
+    def test_active_holds_per_user_are_capped(self):
+        """Test that a user cannot keep more than BOOKING_HOLD_MAX_PER_USER active holds"""
+        self.assertEqual(self.client.post(self.holds_url, self.data, format='json').status_code, status.HTTP_201_CREATED)
+        later = self.start_date + timedelta(days=10)
+        response = self.client.post(self.holds_url, {
+            'vehicle': self.vehicle.id, 'start_date': str(later), 'end_date': str(later)
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_confirm_converts_hold_into_booking(self):
+        """Test that confirming a hold creates a pending booking"""
+        hold_id = self.client.post(self.holds_url, self.data, format='json').data['id']
+        response = self.client.post(f'{self.holds_url}{hold_id}/confirm/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        booking = Booking.objects.get(pk=response.data['id'])
+        self.assertEqual(booking.user, self.user)
+        self.assertEqual(BookingHold.objects.get(pk=hold_id).booking, booking)
+
+        response = self.client.post(f'{self.holds_url}{hold_id}/confirm/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_confirm_locks_vehicle(self):
+        """Test that confirming a hold takes the vehicle lock, like booking writes"""
+        hold_id = self.client.post(self.holds_url, self.data, format='json').data['id']
+        with mock.patch('bookings.holds.lock_vehicle', wraps=holds.lock_vehicle) as lock_vehicle:
+            response = self.client.post(f'{self.holds_url}{hold_id}/confirm/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        lock_vehicle.assert_called_once_with(self.vehicle.pk)
+
+    def test_expired_holds_release_dates(self):
+        """Test that expired holds can't be confirmed and are removed by the expiry job"""
+        hold_id = self.client.post(self.holds_url, self.data, format='json').data['id']
+        BookingHold.objects.filter(pk=hold_id).update(expires_at=timezone.now() - timedelta(seconds=1))
+        response = self.client.post(f'{self.holds_url}{hold_id}/confirm/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        out = StringIO()
+        call_command('expire_holds', stdout=out)
+        self.assertIn('Expired 1 holds', out.getvalue())
+        response = self.other_client.post('/api/bookings/', self.data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class SeedDataTests(TestCase):
+    databases = '__all__'
+
+    def seed(self, **options):
+        call_command('seed_data', users=30, vehicles=8, bookings=400, batch_size=50, stdout=StringIO(), **options)
+        return list(Booking.objects.order_by('vehicle__plate', 'start_date').values_list(
+            'vehicle__plate', 'user__username', 'start_date', 'end_date', 'status', 'created_at'
+        ))
+
+    def test_seed_data_is_deterministic_and_non_overlapping(self):
+        """Test that seeding creates the requested rows, without overlaps, reproducibly"""
+        first = self.seed(seed=7)
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Vehicle.objects.count(), 8)
+        self.assertEqual(len(first), 400)
+        for previous, current in zip(first, first[1:]):
+            self.assertLessEqual(current[2], current[3])
+            if previous[0] == current[0]:
+                self.assertLess(previous[3], current[2])
+        self.assertFalse(Booking.objects.exclude(owner=models.F('vehicle__owner')).exists())
+        self.assertLess(Booking.objects.order_by('created_at').first().created_at, timezone.now() - timedelta(days=30))
+
+        User.objects.all().delete()
+        self.assertEqual(self.seed(seed=7), first)
+
+
+class BookingRollupTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.renter = User.objects.create_user(username='renter', password='testpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.owner).access_token}')
+        self.vehicle = Vehicle.objects.create(owner=self.owner, make='Toyota', model='Corolla', year=2020, plate='LHR-123')
+        self.start = date.today() + timedelta(days=1)
+
+    def rollups(self):
+        return {
+            (row.day, row.vehicle_id, row.status): (row.bookings, row.deposit_amount, row.deposit_paid_amount)
+            for row in BookingDailyRollup.objects.exclude(bookings=0)
+        }
+
+    def rebuilt(self):
+        return {
+            key: (total['bookings'], total['deposit_amount'], total['deposit_paid_amount'])
+            for key, total in aggregate_bookings(Booking, ArchivedBooking).items()
+        }
+
+    def test_rollups_follow_booking_changes(self):
+        """Test that saves, moves, deletes and archiving keep the rollups equal to a full recompute"""
+        first = Booking.objects.create(
+            user=self.renter, vehicle=self.vehicle, start_date=self.start, end_date=self.start, deposit_amount=10
+        )
+        second = Booking.objects.create(
+            user=self.renter, vehicle=self.vehicle, start_date=self.start + timedelta(days=3),
+            end_date=self.start + timedelta(days=4), deposit_amount=20
+        )
+        self.assertEqual(self.rollups()[(self.start, self.vehicle.pk, 'pending')], (1, Decimal('10.00'), Decimal('0.00')))
+
+        first.status = 'confirmed'
+        first.deposit_paid = True
+        first.save()
+        second = Booking.objects.get(pk=second.pk)
+        second.start_date = self.start + timedelta(days=2)
+        second.save()
+        self.assertEqual(self.rollups(), self.rebuilt())
+        self.assertEqual(self.rollups()[(self.start, self.vehicle.pk, 'confirmed')], (1, Decimal('10.00'), Decimal('10.00')))
+
+        Booking.objects.get(pk=second.pk).delete()
+        past = date.today() - timedelta(days=200)
+        first.status = 'completed'
+        first.start_date = first.end_date = past
+        first.save()
+        archive_bookings(older_than_days=90)
+        self.assertEqual(Booking.objects.count(), 0)
+        self.assertEqual(self.rollups(), self.rebuilt())
+        self.assertEqual(list(self.rollups()), [(past, self.vehicle.pk, 'completed')])
+
+        BookingDailyRollup.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_booking_rollups', stdout=out)
+        self.assertIn('Rebuilt 1 rollup rows', out.getvalue())
+        self.assertEqual(self.rollups(), self.rebuilt())
+
+    def test_rollup_delta_uses_stored_row(self):
+        """Test that two stale copies cancelling the same booking move it between statuses only once"""
+        booking = Booking.objects.create(user=self.renter, vehicle=self.vehicle, start_date=self.start, end_date=self.start)
+        first, second = Booking.objects.get(pk=booking.pk), Booking.objects.get(pk=booking.pk)
+        for copy in (first, second):
+            copy.status = 'cancelled'
+            copy.save()
+        self.assertEqual(self.rollups(), self.rebuilt())
+        self.assertEqual(BookingEvent.objects.filter(event_type='booking.status_changed').count(), 1)
+
+    def test_partial_save_counts_only_written_fields(self):
+        """Test that save(update_fields=...) moves the rollups by the columns it writes and no others"""
+        booking = Booking.objects.create(user=self.renter, vehicle=self.vehicle, start_date=self.start, end_date=self.start)
+        booking.status = 'confirmed'
+        booking.start_date = booking.end_date = self.start + timedelta(days=1)
+        booking.save(update_fields=['status'])
+        self.assertEqual(self.rollups(), self.rebuilt())
+        self.assertEqual(list(self.rollups()), [(self.start, self.vehicle.pk, 'confirmed')])
+
+        booking.status = 'cancelled'
+        booking.save(update_fields=['end_date'])
+        self.assertEqual(self.rollups(), self.rebuilt())
+        self.assertEqual(BookingEvent.objects.filter(event_type='booking.status_changed').count(), 1)
+
+    def test_deleting_renter_removes_their_bookings_from_rollups(self):
+        """Test that deleting a user takes their cascaded live and archived bookings out of the rollups"""
+        Booking.objects.create(user=self.renter, vehicle=self.vehicle, start_date=self.start, end_date=self.start)
+        past = Booking.objects.create(
+            user=self.renter, vehicle=self.vehicle, start_date=self.start + timedelta(days=2),
+            end_date=self.start + timedelta(days=2), deposit_amount=10
+        )
+        past.status = 'completed'
+        past.start_date = past.end_date = date.today() - timedelta(days=200)
+        past.save()
+        archive_bookings(older_than_days=90)
+        self.renter.delete()
+        self.assertEqual(self.rollups(), {})
+        self.assertEqual(self.rollups(), self.rebuilt())
+
+    def test_report_reads_only_rollups(self):
+        """Test that the report sums the owner's rollups per month without touching the booking table"""
+        for offset in (0, 2):
+            self.client.post('/api/bookings/', {
+                'vehicle': self.vehicle.pk,
+                'start_date': str(self.start + timedelta(days=offset)),
+                'end_date': str(self.start + timedelta(days=offset)),
+            }, format='json')
+        other_owner = User.objects.create_user(username='other', password='testpass123')
+        other_vehicle = Vehicle.objects.create(owner=other_owner, make='Honda', model='Civic', year=2021, plate='LHR-456')
+        Booking.objects.create(user=self.renter, vehicle=other_vehicle, start_date=self.start, end_date=self.start)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/bookings/report/?period=month')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in queries.captured_queries if 'bookings_booking"' in query['sql']])
+        self.assertEqual(response.data['totals'], {'bookings': 2, 'deposit_amount': '20.00', 'deposit_paid_amount': '0.00'})
+        self.assertEqual({item['vehicle'] for item in response.data['results']}, {self.vehicle.pk})
+        self.assertTrue(all(item['period'].endswith('-01') for item in response.data['results']))
+
+        response = self.client.get(f'/api/bookings/report/?period=day&from={self.start + timedelta(days=1)}')
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['period'], str(self.start + timedelta(days=2)))
+
+
+class BookingIdempotencyTests(TestCase):
+    def setUp(self):
+        caches[settings.THROTTLE_CACHE].clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.vehicle = Vehicle.objects.create(owner=self.user, make='Toyota', model='Corolla', year=2020, plate='LHR-123')
+        start_date = date.today() + timedelta(days=1)
+        self.data = {'vehicle': self.vehicle.pk, 'start_date': str(start_date), 'end_date': str(start_date)}
+
+    def post(self, data, key):
+        return self.client.post('/api/bookings/', data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_is_replayed_without_touching_bookings(self):
+        """Test that a retried create is answered from the store instead of conflicting with itself"""
+        first = self.post(self.data, 'booking-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.post(self.data, 'booking-1')
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data, first.data)
+        self.assertFalse([query for query in queries.captured_queries if 'bookings_' in query['sql']])
+        self.assertEqual(Booking.objects.count(), 1)
+
+        response = self.post(self.data, 'booking-2')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_key_reuse_and_in_flight_requests_are_rejected(self):
+        """Test that a reused key with another body gets 422 and a concurrent retry gets 409"""
+        self.post(self.data, 'booking-1')
+        other = {**self.data, 'end_date': str(date.today() + timedelta(days=2))}
+        self.assertEqual(self.post(other, 'booking-1').status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        with mock.patch.object(caches['idempotency'], 'add', return_value=False):
+            response = self.post(self.data, 'booking-3')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_expired_lock_taken_by_a_retry_is_not_released(self):
+        """Test that a slow request does not delete a lock that a retry took after its own lock expired"""
+        store = caches['idempotency']
+        locks = []
+        add, perform_create = store.add, BookingViewSet.perform_create
+
+        def record_add(key, *args, **kwargs):
+            locks.append(key)
+            return add(key, *args, **kwargs)
+
+        def slow_create(viewset, serializer):
+            # Our lock expires mid-request and a retry takes the key.
+            store.set(locks[0], 'retry-token')
+            perform_create(viewset, serializer)
+
+        with mock.patch.object(store, 'add', record_add), \
+                mock.patch.object(BookingViewSet, 'perform_create', slow_create):
+            self.assertEqual(self.post(self.data, 'booking-1').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(store.get(locks[0]), 'retry-token')
+
+    def test_process_local_cache_is_rejected(self):
+        """Test that a local-memory idempotency cache fails the startup check"""
+        caches_setting = {**settings.CACHES, 'idempotency': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=caches_setting), self.assertRaises(ImproperlyConfigured):
+            check_cache_backend()
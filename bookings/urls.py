@@ -1,11 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BookingViewSet
+from .streams import booking_event_stream
+from .views import BookingHoldViewSet, BookingViewSet, WebhookEndpointViewSet
 
 router = DefaultRouter()
 router.register(r'bookings', BookingViewSet, basename='booking')
+router.register(r'holds', BookingHoldViewSet, basename='hold')
+router.register(r'webhooks', WebhookEndpointViewSet, basename='webhook')
 
 urlpatterns = [
+    path('bookings/events/stream/', booking_event_stream, name='booking_event_stream'),
     path('', include(router.urls)),
 ]
 
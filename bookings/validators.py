@@ -1,5 +1,6 @@
 from django.core.exceptions import ValidationError
 from datetime import date
+from .holds import HOLD_CONFLICT_MESSAGE, held_by_others
 from .models import Booking
 
 
@@ -16,10 +17,13 @@ def validate_booking_dates(start_date, end_date):
         raise ValidationError("Start date cannot be in the past.")
 
 
-def validate_no_overlap(vehicle, start_date, end_date, exclude_booking=None):
+def validate_no_overlap(vehicle, start_date, end_date, exclude_booking=None, user=None):
+    if held_by_others(vehicle.pk, start_date, end_date, user.pk if user else None):
+        raise ValidationError(HOLD_CONFLICT_MESSAGE)
+
     overlapping = Booking.objects.filter(
         vehicle=vehicle,
-        status__in=['pending', 'confirmed'],
+        status__in=Booking.ACTIVE_STATUSES,
         start_date__lte=end_date,
         end_date__gte=start_date
     )
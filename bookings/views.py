@@ -1,11 +1,72 @@
-from rest_framework import status, viewsets
+from decimal import Decimal
+from django.db import router, transaction
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from .models import Booking
-from .serializers import BookingSerializer, BookingCreateSerializer
+from rental_backend.idempotency import IdempotentCreateMixin
+from rental_backend.sharding import current_city, fan_out
+from .availability import check_availability, reserve_available
+from .filters import (
+    filter_bookings, filter_history, filter_rollups, history_filters, keyset_cursor, report_filters
+)
+from .holds import confirm_hold, lock_dates, place_hold, release_hold
+from .models import ArchivedBooking, Booking, BookingDailyRollup, BookingHold, WebhookEndpoint
+from .rollups import booking_report
+from .serializers import (
+    ArchivedBookingSerializer, BookingBatchSerializer, BookingHoldSerializer, BookingSerializer,
+    BookingCreateSerializer, WebhookEndpointSerializer
+)
 
 
-class BookingViewSet(viewsets.ModelViewSet):
+def booking_history(user, filters):
+    live = BookingSerializer(filter_history(Booking.objects.filter(user=user), filters), many=True).data
+    for item in live:
+        item['archived'] = False
+    archived_bookings = list(filter_history(
+        ArchivedBooking.objects.filter(user=user).select_related('vehicle'), filters, id_field='original_id'
+    ))
+    for booking in archived_bookings:
+        booking.user = user
+    return live + ArchivedBookingSerializer(archived_bookings, many=True).data
+
+
+def keyset_page(pages, limit):
+    """Merge per-shard pages newest first and cut to ``limit``, with the cursor of the next page."""
+    results = sorted(
+        (item for items in pages for item in items),
+        key=lambda item: (parse_datetime(item['created_at']), item['id']),
+        reverse=True
+    )[:limit]
+    return {
+        'count': len(results),
+        'next_before': keyset_cursor(results[-1]) if len(results) == limit else None,
+        'results': results
+    }
+
+
+def booking_report_rows(user, filters):
+    rollups = BookingDailyRollup.objects.all()
+    if not user.is_staff:
+        rollups = rollups.filter(owner=user)
+    city = current_city()
+    return [
+        {
+            'period': row['period'].isoformat(),
+            'city': city,
+            'vehicle': row['vehicle_id'],
+            'status': row['status'],
+            'bookings': row['bookings_count'],
+            'deposit_amount': f"{row['deposits']:.2f}",
+            'deposit_paid_amount': f"{row['deposits_paid']:.2f}",
+        }
+        for row in booking_report(filter_rollups(rollups, filters), filters['period'])
+    ]
+
+
+class BookingViewSet(IdempotentCreateMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_serializer_class(self):
@@ -15,26 +76,22 @@ class BookingViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         queryset = Booking.objects.filter(user=self.request.user)
-        
-        from_date = self.request.query_params.get('from', None)
-        if from_date:
-            try:
-                queryset = queryset.filter(start_date__gte=from_date)
-            except ValueError:
-                pass
-        
-        to_date = self.request.query_params.get('to', None)
-        if to_date:
-            try:
-                queryset = queryset.filter(end_date__lte=to_date)
-            except ValueError:
-                pass
-        
-        status_filter = self.request.query_params.get('status', None)
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
-        
-        return queryset.order_by('-created_at')
+        return self.filter_bookings(queryset)
+
+    def filter_bookings(self, queryset):
+        return filter_bookings(queryset, self.request.query_params)
+
+    def get_object(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            booking = Booking.objects.select_related('vehicle').get(pk=self.kwargs[lookup_url_kwarg])
+        except (Booking.DoesNotExist, ValueError):
+            raise Http404
+        if booking.user_id != self.request.user.pk:
+            raise Http404
+        booking.user = self.request.user
+        self.check_object_permissions(self.request, booking)
+        return booking
 
     def perform_create(self, serializer):
         start_date = serializer.validated_data['start_date']
@@ -43,12 +100,23 @@ class BookingViewSet(viewsets.ModelViewSet):
         estimated_cost = days * 50
         deposit_amount = estimated_cost * 0.20
         
-        serializer.save(
-            user=self.request.user,
-            status='pending',
-            deposit_amount=deposit_amount,
-            deposit_paid=False
-        )
+        with transaction.atomic(using=router.db_for_write(Booking)):
+            lock_dates(serializer.validated_data['vehicle'], start_date, end_date, self.request.user.pk)
+            serializer.save(
+                user=self.request.user,
+                status='pending',
+                deposit_amount=deposit_amount,
+                deposit_paid=False
+            )
+
+    def perform_update(self, serializer):
+        booking = serializer.instance
+        vehicle = serializer.validated_data.get('vehicle', booking.vehicle)
+        start_date = serializer.validated_data.get('start_date', booking.start_date)
+        end_date = serializer.validated_data.get('end_date', booking.end_date)
+        with transaction.atomic(using=router.db_for_write(Booking, instance=booking)):
+            lock_dates(vehicle, start_date, end_date, self.request.user.pk, exclude_booking=booking)
+            serializer.save()
 
     def list(self, request, *args, **kwargs):
         response = super().list(request, *args, **kwargs)
@@ -60,3 +128,88 @@ class BookingViewSet(viewsets.ModelViewSet):
                 'results': response.data
             }
         return response
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        serializer = BookingBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['items']
+        if serializer.validated_data['reserve']:
+            results = reserve_available(request.user, items)
+        else:
+            results = check_availability(request.user, items)
+        for result in results:
+            result['deposit_amount'] = str(result['deposit_amount'])
+        return Response({
+            'count': len(results),
+            'available': sum(1 for result in results if result['available']),
+            'reserved': sum(1 for result in results if 'booking' in result),
+            'results': results
+        })
+
+    @action(detail=False, methods=['get'])
+    def inbox(self, request):
+        filters = history_filters(request.query_params)
+        queryset = filter_history(Booking.objects.filter(owner=request.user), filters)
+        return Response(keyset_page([BookingSerializer(queryset, many=True).data], filters['limit']))
+
+    @action(detail=False, methods=['get'])
+    def report(self, request):
+        filters = report_filters(request.query_params)
+        shards = fan_out(lambda: booking_report_rows(request.user, filters))
+        results = sorted(
+            (item for items in shards.values() for item in items),
+            key=lambda item: (item['period'], item['city'], item['vehicle'], item['status'])
+        )
+        return Response({
+            'period': filters['period'],
+            'count': len(results),
+            'totals': {
+                'bookings': sum(item['bookings'] for item in results),
+                'deposit_amount': f"{sum(Decimal(item['deposit_amount']) for item in results):.2f}",
+                'deposit_paid_amount': f"{sum(Decimal(item['deposit_paid_amount']) for item in results):.2f}",
+            },
+            'results': results
+        })
+
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        filters = history_filters(request.query_params)
+        shards = fan_out(lambda: booking_history(request.user, filters))
+        return Response(keyset_page(shards.values(), filters['limit']))
+
+
+class WebhookEndpointViewSet(viewsets.ModelViewSet):
+    serializer_class = WebhookEndpointSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return WebhookEndpoint.objects.filter(owner=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+
+class BookingHoldViewSet(mixins.CreateModelMixin,
+                         mixins.RetrieveModelMixin,
+                         mixins.DestroyModelMixin,
+                         mixins.ListModelMixin,
+                         viewsets.GenericViewSet):
+    serializer_class = BookingHoldSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return BookingHold.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        serializer.instance = place_hold(self.request.user, data['vehicle'], data['start_date'], data['end_date'])
+
+    def perform_destroy(self, instance):
+        release_hold(instance)
+
+    @action(detail=True, methods=['post'])
+    def confirm(self, request, pk=None):
+        booking = confirm_hold(self.get_object())
+        return Response(BookingSerializer(booking).data, status=status.HTTP_201_CREATED)
+
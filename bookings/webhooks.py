@@ -0,0 +1,171 @@
+import hashlib
+import hmac
+import ipaddress
+import json
+import socket
+from collections import defaultdict
+from datetime import timedelta
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import BookingEvent, WebhookEndpoint
+
+DEFAULTS = {
+    'BATCH_SIZE': 100,
+    'TIMEOUT': 5,
+    'MAX_ATTEMPTS': 8,
+    'MAX_BACKOFF': 3600,
+    'SSE_POLL_INTERVAL': 2,
+    'SSE_KEEPALIVE': 15,
+    'RETENTION': 7 * 86400,
+    'ALLOW_LOCAL_URLS': False,
+}
+
+
+def webhook_settings():
+    return {**DEFAULTS, **getattr(settings, 'WEBHOOKS', {})}
+
+
+def sign(secret, body):
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def is_public_address(address):
+    ip = ipaddress.ip_address(address.split('%')[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def resolve_webhook_url(url):
+    """Return ``(parts, address)`` for a URL the dispatcher may POST to.
+
+    Raises ``ValueError`` unless the URL is https and every address its host
+    resolves to is public, so endpoints cannot reach loopback, private,
+    link-local or cloud-metadata addresses. ``ALLOW_LOCAL_URLS`` lifts both
+    rules for development and tests.
+    """
+    allow_local = webhook_settings()['ALLOW_LOCAL_URLS']
+    parts = urlsplit(url)
+    if parts.scheme != 'https' and not (allow_local and parts.scheme == 'http'):
+        raise ValueError('Webhook URLs must use https.')
+    if not parts.hostname:
+        raise ValueError('Webhook URL has no host.')
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        infos = socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+    except (OSError, UnicodeError, ValueError):
+        raise ValueError(f'Cannot resolve {parts.hostname}.')
+    addresses = [info[4][0] for info in infos]
+    if not allow_local and not all(is_public_address(address) for address in addresses):
+        raise ValueError(f'{parts.hostname} resolves to a non-public address.')
+    return parts, addresses[0]
+
+
+def open_connection(parts, address, timeout):
+    """HTTP(S) connection to ``parts.hostname`` over a socket to the already-checked ``address``.
+
+    Connecting to the checked address, rather than letting the client resolve
+    the name again, keeps a DNS change between check and use from steering
+    the request to an internal host.
+    """
+    import http.client
+    import ssl
+
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    connection = connection_class(parts.hostname, parts.port, timeout=timeout)
+    sock = socket.create_connection((address, connection.port), timeout)
+    if parts.scheme == 'https':
+        sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parts.hostname)
+    connection.sock = sock
+    return connection
+
+
+def post_batch(endpoint, events, timeout):
+    import http.client
+
+    try:
+        parts, address = resolve_webhook_url(endpoint.url)
+        connection = open_connection(parts, address, timeout)
+    except (ValueError, OSError):
+        return False
+
+    body = json.dumps({'events': [event.as_message() for event in events]}).encode()
+    path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    try:
+        # Redirects are not followed: a 3xx is a failed delivery.
+        connection.request('POST', path, body=body, headers={
+            'Content-Type': 'application/json',
+            'X-Rental-Signature': f'sha256={sign(endpoint.secret, body)}',
+        })
+        return 200 <= connection.getresponse().status < 300
+    except (http.client.HTTPException, OSError):
+        return False
+    finally:
+        connection.close()
+
+
+def pending_events(now, batch_size):
+    return list(
+        BookingEvent.objects.select_for_update(skip_locked=True)
+        .filter(delivered_at__isnull=True, failed=False)
+        .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+        .order_by('id')[:batch_size]
+    )
+
+
+def dispatch_pending_events(batch_size=None):
+    """Deliver one batch of outbox events, one POST per owner endpoint.
+
+    Delivery is at-least-once: a batch that fails on any of the owner's
+    endpoints is retried on all of them with exponential backoff, so
+    receivers should de-duplicate on the event ``id``. The batch stays
+    row-locked until it is marked, and concurrent dispatchers skip locked
+    rows, so each event is sent by one dispatcher at a time.
+    """
+    with transaction.atomic(using=router.db_for_write(BookingEvent)):
+        return _dispatch(webhook_settings(), batch_size)
+
+
+def _dispatch(config, batch_size):
+    now = timezone.now()
+    events = pending_events(now, batch_size or config['BATCH_SIZE'])
+    if not events:
+        return 0
+
+    by_owner = defaultdict(list)
+    for event in events:
+        by_owner[event.owner_id].append(event)
+
+    endpoints = defaultdict(list)
+    for endpoint in WebhookEndpoint.objects.filter(owner_id__in=by_owner, is_active=True):
+        endpoints[endpoint.owner_id].append(endpoint)
+
+    delivered, retried = [], []
+    for owner_id, owner_events in by_owner.items():
+        ok = all(post_batch(endpoint, owner_events, config['TIMEOUT']) for endpoint in endpoints[owner_id])
+        (delivered if ok else retried).extend(owner_events)
+
+    BookingEvent.objects.filter(pk__in=[event.pk for event in delivered]).update(delivered_at=now)
+    for event in retried:
+        event.attempts += 1
+        event.failed = event.attempts >= config['MAX_ATTEMPTS']
+        event.next_attempt_at = now + timedelta(seconds=min(2 ** event.attempts, config['MAX_BACKOFF']))
+    BookingEvent.objects.bulk_update(retried, ['attempts', 'failed', 'next_attempt_at'])
+    return len(delivered)
+
+
+def prune_delivered_events(batch_size=1000):
+    """Delete events delivered more than ``RETENTION`` seconds ago."""
+    cutoff = timezone.now() - timedelta(seconds=webhook_settings()['RETENTION'])
+    total = 0
+    while True:
+        delivered = list(
+            BookingEvent.objects.filter(delivered_at__lt=cutoff).values_list('pk', flat=True)[:batch_size]
+        )
+        if not delivered:
+            return total
+        BookingEvent.objects.filter(pk__in=delivered).delete()
+        total += len(delivered)
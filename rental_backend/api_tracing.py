@@ -0,0 +1,24 @@
+"""DRF and simplejwt adapters that record ``rental_backend.tracing`` spans."""
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from .tracing import span
+
+
+class TracedJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        with span('auth.jwt'):
+            return super().authenticate(request)
+
+
+class TracedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span('render.json'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class TracedValidationMixin:
+    """Serializer mixin that records ``is_valid()`` as a span named after the serializer."""
+
+    def is_valid(self, *args, **kwargs):
+        with span('serializer.validate', serializer=type(self).__name__):
+            return super().is_valid(*args, **kwargs)
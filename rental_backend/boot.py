@@ -0,0 +1,64 @@
+"""Measure worker cold-start import cost.
+
+Runs ``django.setup()`` plus URLconf loading in a fresh interpreter under
+``python -X importtime`` and summarizes the result::
+
+    python -m rental_backend.boot --settings rental_backend.settings_api
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+BOOT_SNIPPET = (
+    'import django; django.setup(); '
+    'from django.urls import get_resolver; get_resolver().url_patterns'
+)
+
+
+def parse_importtime(stderr):
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        modules.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def measure_boot(settings_module):
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module}
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT_SNIPPET],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    modules = parse_importtime(result.stderr)
+    top_level = [module for module in modules if not module[0].startswith(' ')]
+    return {
+        'settings': settings_module,
+        'wall_ms': wall_ms,
+        'import_ms': sum(cumulative for _, _, cumulative in top_level) / 1000,
+        'module_count': len(modules),
+        'slowest': sorted(top_level, key=lambda module: module[2], reverse=True)[:10],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--settings', default='rental_backend.settings_api')
+    args = parser.parse_args()
+    report = measure_boot(args.settings)
+    print(f"{report['settings']}: {report['import_ms']:.1f} ms imports, "
+          f"{report['wall_ms']:.1f} ms wall, {report['module_count']} modules")
+    for name, _, cumulative in report['slowest']:
+        print(f'  {cumulative / 1000:8.1f} ms  {name.strip()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Idempotency keys for create endpoints.
+
+Clients send ``Idempotency-Key: <unique string>`` with a POST. The first
+request runs normally, and a successful response is stored in the cache for
+``IDEMPOTENCY['TTL']`` seconds. A retry with the same key, user and endpoint
+is answered from the cache with ``Idempotent-Replayed: true``, without running
+the view. Reusing a key with a different body is rejected with 422. A retry
+that arrives while the first request is still running gets 409. Failed
+requests are not stored, so their retries run again.
+
+Retries can land on any worker, so ``IDEMPOTENCY['CACHE']`` must name a cache
+shared by every worker; ``check_cache_backend`` refuses to start with a
+per-process backend.
+"""
+import hashlib
+import json
+import secrets
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import status
+from rest_framework.response import Response
+from .sharding import current_shard
+
+DEFAULTS = {
+    'HEADER': 'Idempotency-Key',
+    'TTL': 24 * 60 * 60,
+    'LOCK_TIMEOUT': 30,
+    'CACHE': 'default',
+    'MAX_KEY_LENGTH': 255,
+}
+
+REPLAYED_HEADERS = ('Location',)
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def idempotency_settings():
+    return {**DEFAULTS, **getattr(settings, 'IDEMPOTENCY', {})}
+
+
+def check_cache_backend():
+    alias = idempotency_settings()['CACHE']
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend is None:
+        raise ImproperlyConfigured(f"IDEMPOTENCY['CACHE'] refers to an unknown cache '{alias}'.")
+    if backend in PROCESS_LOCAL_BACKENDS:
+        raise ImproperlyConfigured(
+            f"IDEMPOTENCY['CACHE'] ('{alias}') uses {backend}, which is not shared between workers; "
+            "retries on another worker would run again. Use a database, Redis or Memcached cache."
+        )
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _error(detail, status_code):
+    return Response({'detail': detail}, status=status_code)
+
+
+def idempotent(request, handler):
+    """Run ``handler()`` once per idempotency key and replay its response afterwards."""
+    config = idempotency_settings()
+    key = request.headers.get(config['HEADER'])
+    if not key:
+        return handler()
+    if len(key) > config['MAX_KEY_LENGTH']:
+        return _error(f"{config['HEADER']} must be at most {config['MAX_KEY_LENGTH']} characters.", status.HTTP_400_BAD_REQUEST)
+
+    cache = caches[config['CACHE']]
+    scope = hashlib.sha256(
+        f'{request.user.pk}:{request.method}:{request.path}:{current_shard()}:{key}'.encode()
+    ).hexdigest()
+    response_key = f'idempotency:response:{scope}'
+    lock_key = f'idempotency:lock:{scope}'
+    fingerprint = request_fingerprint(request)
+
+    token = secrets.token_hex(16)
+    stored = cache.get(response_key)
+    if stored is None:
+        if not cache.add(lock_key, token, config['LOCK_TIMEOUT']):
+            response = _error('A request with this idempotency key is still being processed.', status.HTTP_409_CONFLICT)
+            response['Retry-After'] = '1'
+            return response
+        # The first request may have finished between the lookup and the lock.
+        stored = cache.get(response_key)
+        if stored is not None:
+            cache.delete(lock_key)
+    if stored is not None:
+        if stored['fingerprint'] != fingerprint:
+            return _error(
+                'This idempotency key was already used with a different request.',
+                status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        response = Response(stored['data'], status=stored['status'], headers=stored['headers'])
+        response['Idempotent-Replayed'] = 'true'
+        return response
+
+    try:
+        response = handler()
+        if status.is_success(response.status_code):
+            cache.set(response_key, {
+                'fingerprint': fingerprint,
+                'status': response.status_code,
+                'data': response.data,
+                'headers': {name: response[name] for name in REPLAYED_HEADERS if response.has_header(name)},
+            }, config['TTL'])
+        return response
+    finally:
+        # The lock may have expired and been taken by a retry; only release our own.
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+class IdempotentCreateMixin:
+    """Viewset mixin that honours ``Idempotency-Key`` on ``create``."""
+
+    def create(self, request, *args, **kwargs):
+        return idempotent(request, lambda: super(IdempotentCreateMixin, self).create(request, *args, **kwargs))
@@ -0,0 +1,55 @@
+import threading
+from django.conf import settings
+from django.http import JsonResponse
+
+LOW_PRIORITY_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class AdmissionControlMiddleware:
+    """Sheds load when too many requests are in flight in this worker.
+
+    Above ``SHED_READS_ABOVE`` concurrent requests, reads are rejected with
+    503 so writes such as booking creation keep their worker slots. Above
+    ``MAX_IN_FLIGHT`` every request is rejected.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.lock = threading.Lock()
+        self.in_flight = 0
+
+    @property
+    def config(self):
+        return {
+            'ENABLED': True,
+            'SHED_READS_ABOVE': 32,
+            'MAX_IN_FLIGHT': 64,
+            'RETRY_AFTER': 1,
+            **getattr(settings, 'ADMISSION_CONTROL', {}),
+        }
+
+    def should_shed(self, request, depth, config):
+        if depth > config['MAX_IN_FLIGHT']:
+            return True
+        return depth > config['SHED_READS_ABOVE'] and request.method in LOW_PRIORITY_METHODS
+
+    def __call__(self, request):
+        config = self.config
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        with self.lock:
+            self.in_flight += 1
+            depth = self.in_flight
+        try:
+            if self.should_shed(request, depth, config):
+                response = JsonResponse(
+                    {'detail': 'Server is busy, please retry shortly.'},
+                    status=503
+                )
+                response['Retry-After'] = str(config['RETRY_AFTER'])
+                return response
+            return self.get_response(request)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
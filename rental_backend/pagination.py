@@ -0,0 +1,40 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """Admin paginator that avoids ``COUNT(*)`` on large unfiltered tables.
+
+    On PostgreSQL the planner's row estimate from ``pg_class`` is used when the
+    changelist is unfiltered and the table is bigger than ``estimate_threshold``.
+    Filtered querysets and other backends fall back to an exact count.
+    """
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        estimate = self._estimated_count()
+        if estimate is not None and estimate > self.estimate_threshold:
+            return estimate
+        return super().count
+
+    def _estimated_count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is None or query.where:
+            return None
+
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if not row or row[0] < 0:
+            return None
+        return int(row[0])
@@ -0,0 +1,117 @@
+"""On-demand cProfile capture for single requests.
+
+Staff users send ``X-Profile: 1`` with a JWT to profile one request; a tiny
+``SAMPLE_RATE`` can also profile random requests. Each capture is stored as
+``<id>.prof`` (pstats) and ``<id>.txt`` (call tree sorted by cumulative time)
+under ``PROFILING['DIR']`` and its id is returned in the ``X-Profile-Id``
+header. Staff download captures from ``/api/profiles/<id>/``
+(``?artifact=txt`` for the text summary). Only the newest ``MAX_PROFILES``
+captures are kept. With ``ENABLED`` false the middleware removes itself
+from the chain.
+"""
+import io
+import random
+import re
+import secrets
+import time
+from pathlib import Path
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, Http404
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAdminUser
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+DEFAULTS = {
+    'ENABLED': False,
+    'HEADER': 'X-Profile',
+    'SAMPLE_RATE': 0.0,
+    'DIR': 'profiles',
+    'TOP_FUNCTIONS': 60,
+    'MAX_PROFILES': 100,
+}
+
+PROFILE_ID_RE = re.compile(r'^[0-9]{14}-[0-9a-f]{8}$')
+
+
+def profiling_settings():
+    return {**DEFAULTS, **getattr(settings, 'PROFILING', {})}
+
+
+def profile_dir():
+    return Path(profiling_settings()['DIR'])
+
+
+def requested_by_staff(request, header):
+    if not request.headers.get(header):
+        return False
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return bool(result and result[0].is_staff)
+
+
+def save_profile(profiler, request, top_functions):
+    import pstats
+
+    profile_id = f"{time.strftime('%Y%m%d%H%M%S')}-{secrets.token_hex(4)}"
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(directory / f'{profile_id}.prof')
+
+    summary = io.StringIO()
+    summary.write(f'{request.method} {request.get_full_path()}\n\n')
+    stats = pstats.Stats(profiler, stream=summary)
+    stats.sort_stats('cumulative').print_stats(top_functions)
+    stats.print_callees(top_functions // 3)
+    (directory / f'{profile_id}.txt').write_text(summary.getvalue())
+    return profile_id
+
+
+def prune_profiles(keep):
+    """Delete all but the ``keep`` most recent captures."""
+    captures = sorted(profile_dir().glob('*.prof'), key=lambda path: path.stat().st_mtime_ns, reverse=True)
+    for path in captures[keep:]:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.txt').unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.config = profiling_settings()
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        if self.config['SAMPLE_RATE'] and random.random() < self.config['SAMPLE_RATE']:
+            return True
+        return requested_by_staff(request, self.config['HEADER'])
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        response['X-Profile-Id'] = save_profile(profiler, request, self.config['TOP_FUNCTIONS'])
+        prune_profiles(self.config['MAX_PROFILES'])
+        return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_download(request, profile_id):
+    artifact = 'txt' if request.query_params.get('artifact') == 'txt' else 'prof'
+    path = profile_dir() / f'{profile_id}.{artifact}'
+    if not PROFILE_ID_RE.match(profile_id) or not path.exists():
+        raise Http404
+    return FileResponse(path.open('rb'), as_attachment=True, filename=path.name)
@@ -22,6 +22,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'rental_backend.middleware.AdmissionControlMiddleware',
+    'rental_backend.tracing.TracingMiddleware',
+    'rental_backend.sharding.CityMiddleware',
+    'rental_backend.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,9 +58,31 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    'karachi': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_karachi.sqlite3',
+    },
+    'islamabad': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_islamabad.sqlite3',
+    },
+}
+
+# Vehicles and bookings are sharded by city; users and auth stay on 'default'.
+SHARDING = {
+    'DEFAULT_CITY': 'lahore',
+    'CITIES': {
+        'lahore': 'default',
+        'karachi': 'karachi',
+        'islamabad': 'islamabad',
+    },
+    'HEADER': 'X-City',
+    'MAX_WORKERS': 8,
 }
 
+DATABASE_ROUTERS = ['rental_backend.sharding.CityShardRouter']
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -86,24 +112,130 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rental_backend.api_tracing.TracedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'rental_backend.api_tracing.TracedJSONRenderer',
     ),
     'EXCEPTION_HANDLER': 'rest_framework.views.exception_handler',
+    'DEFAULT_THROTTLE_CLASSES': (
+        'rental_backend.throttling.UserWindowThrottle',
+        'rental_backend.throttling.IPWindowThrottle',
+        'rental_backend.throttling.EndpointWindowThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'user': '600/min',
+        'ip': '1200/min',
+        'login': '300/min',
+        'register': '120/min',
+        'booking.create': '300/min',
+        'booking.batch': '60/min',
+        'hold.create': '30/min',
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Shared by every worker; create the table with `python manage.py createcachetable`.
+    'idempotency': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'idempotency_cache',
+    },
+    # Rate-limit windows; must be shared too, or each worker grants the full rate.
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'throttle_cache',
+    },
+}
+
+THROTTLE_CACHE = 'throttle'
+
+BOOKING_HOLD_TTL = 600
+BOOKING_HOLD_MAX_PER_USER = 5
+
+WEBHOOKS = {
+    'BATCH_SIZE': 100,
+    'TIMEOUT': 5,
+    'MAX_ATTEMPTS': 8,
+    'MAX_BACKOFF': 3600,
+    'SSE_POLL_INTERVAL': 2,
+    'SSE_KEEPALIVE': 15,
+    # Delivered events are deleted this many seconds after delivery.
+    'RETENTION': 7 * 86400,
+    # Permit http and private/loopback endpoint URLs (development only).
+    'ALLOW_LOCAL_URLS': False,
+}
+
+TRACING = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 0.0,
+    # Honour the sampled flag of an incoming traceparent only from these callers.
+    'TRUST_TRACEPARENT': False,
+    'TRUSTED_PROXIES': [],
+    'MAX_TRACES_PER_SECOND': 10,
+    'EXPORTER': 'file',
+    'FILE_PATH': BASE_DIR / 'traces.jsonl',
+    'FILE_MAX_BYTES': 50 * 1024 * 1024,
+    'FILE_BACKUP_COUNT': 3,
+    'SLOW_QUERY_MS': 200,
+}
+
+PROFILING = {
+    'ENABLED': False,
+    'HEADER': 'X-Profile',
+    'SAMPLE_RATE': 0.0,
+    'DIR': BASE_DIR / 'profiles',
+    'MAX_PROFILES': 100,
+}
+
+ADMISSION_CONTROL = {
+    'ENABLED': True,
+    'SHED_READS_ABOVE': 32,
+    'MAX_IN_FLIGHT': 64,
+    'RETRY_AFTER': 1,
 }
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-    'ROTATE_REFRESH_TOKENS': False,
+    'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.serializers.RevocableTokenRefreshSerializer',
+}
+
+# Revoked refresh tokens must be visible to every worker; process-local
+# backends are rejected at startup. Workers pick up revocations made
+# elsewhere within SYNC_INTERVAL seconds.
+TOKEN_REVOCATION = {
+    'BACKEND': 'authentication.revocation.DatabaseRevocationBackend',
+    'OPTIONS': {},
+    'BLOOM_CAPACITY': 100000,
+    'BLOOM_ERROR_RATE': 0.001,
+    'SYNC_INTERVAL': 5,
+    'PURGE_INTERVAL': 600,
+}
+
+# Responses to create requests carrying an Idempotency-Key are replayed
+# from this cache for TTL seconds. It must be shared across workers;
+# local-memory caches are rejected at startup.
+IDEMPOTENCY = {
+    'HEADER': 'Idempotency-Key',
+    'TTL': 24 * 60 * 60,
+    'CACHE': 'idempotency',
+}
+
+# Registration pipeline: warm password validators at startup and cap
+# concurrent password hashing (None = one hashing thread per CPU).
+REGISTRATION = {
+    'PRELOAD': True,
+    'HASH_WORKERS': None,
 }
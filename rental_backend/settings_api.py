@@ -0,0 +1,25 @@
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE
+
+# API-only worker profile: JWT requests never touch the admin, sessions,
+# flash messages, static files or the template engine, so those apps and
+# middleware are not loaded. Use with DJANGO_SETTINGS_MODULE=rental_backend.settings_api.
+
+API_ONLY_EXCLUDED_APPS = (
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+)
+
+API_ONLY_EXCLUDED_MIDDLEWARE = (
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+)
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in API_ONLY_EXCLUDED_APPS]
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in API_ONLY_EXCLUDED_MIDDLEWARE]
+TEMPLATES = []
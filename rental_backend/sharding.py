@@ -0,0 +1,150 @@
+"""City sharding for vehicles and bookings.
+
+Every city maps to a database alias in ``SHARDING['CITIES']``; several
+cities may share one alias. ``CityMiddleware`` takes the request's city from
+the ``X-City`` header (or ``?city=``) and keeps it in a context variable that
+``CityShardRouter`` reads, so models of the sharded apps are stored on that
+city's database while users and auth data stay on ``default``. Saved rows
+carry a ``city`` column and are routed by it. ``fan_out`` runs a function once
+per shard, in parallel threads, for cross-city reads such as a user's
+booking history.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+
+DEFAULTS = {
+    'DEFAULT_CITY': 'lahore',
+    'CITIES': {'lahore': 'default'},
+    'HEADER': 'X-City',
+    'MAX_WORKERS': 8,
+}
+
+SHARDED_APPS = ('vehicles', 'bookings')
+
+_current_city = contextvars.ContextVar('current_city', default=None)
+
+
+def sharding_settings():
+    return {**DEFAULTS, **getattr(settings, 'SHARDING', {})}
+
+
+def current_city():
+    return _current_city.get() or sharding_settings()['DEFAULT_CITY']
+
+
+def shard_for_city(city):
+    return sharding_settings()['CITIES'][city]
+
+
+def current_shard():
+    return shard_for_city(current_city())
+
+
+def shard_cities():
+    """One city per shard alias, in configuration order."""
+    shards = {}
+    for city, alias in sharding_settings()['CITIES'].items():
+        shards.setdefault(alias, city)
+    return shards
+
+
+@contextmanager
+def use_city(city):
+    token = _current_city.set(city)
+    try:
+        yield shard_for_city(city)
+    finally:
+        _current_city.reset(token)
+
+
+def _run_in_thread(city, func):
+    try:
+        with use_city(city):
+            return func()
+    finally:
+        connections.close_all()
+
+
+def fan_out(func):
+    """Call ``func()`` once per shard with that shard's city active; return ``{alias: result}``.
+
+    Shards run in parallel threads, except that a shard whose connection is
+    inside a transaction on this thread is queried inline so the call sees
+    that transaction's writes.
+    """
+    shards = shard_cities()
+    results = {}
+    inline = {alias: city for alias, city in shards.items() if connections[alias].in_atomic_block}
+    threaded = {alias: city for alias, city in shards.items() if alias not in inline}
+    if len(threaded) == 1:
+        inline.update(threaded)
+        threaded = {}
+
+    if threaded:
+        workers = min(len(threaded), sharding_settings()['MAX_WORKERS'])
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                alias: executor.submit(contextvars.copy_context().run, _run_in_thread, city, func)
+                for alias, city in threaded.items()
+            }
+            for alias, city in inline.items():
+                with use_city(city):
+                    results[alias] = func()
+            results.update({alias: future.result() for alias, future in futures.items()})
+    else:
+        for alias, city in inline.items():
+            with use_city(city):
+                results[alias] = func()
+    return {alias: results[alias] for alias in shards}
+
+
+def is_sharded(model):
+    return model._meta.app_label in SHARDED_APPS
+
+
+class CityShardRouter:
+    def _shard(self, model, hints):
+        instance = hints.get('instance')
+        if instance is not None and is_sharded(type(instance)):
+            city = getattr(instance, 'city', None)
+            if city:
+                return shard_for_city(city)
+            if instance._state.db:
+                return instance._state.db
+        return current_shard()
+
+    def db_for_read(self, model, **hints):
+        return self._shard(model, hints) if is_sharded(model) else 'default'
+
+    def db_for_write(self, model, **hints):
+        return self._shard(model, hints) if is_sharded(model) else 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not (is_sharded(type(obj1)) and is_sharded(type(obj2))):
+            return True
+        return obj1._state.db == obj2._state.db
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Every shard carries the full schema; shards simply leave the
+        # user and auth tables empty.
+        return True
+
+
+class CityMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = sharding_settings()
+
+    def __call__(self, request):
+        city = request.headers.get(self.config['HEADER']) or request.GET.get('city')
+        if not city:
+            return self.get_response(request)
+        city = city.strip().lower()
+        if city not in self.config['CITIES']:
+            return JsonResponse({'detail': f'Unknown city: {city}.'}, status=400)
+        with use_city(city):
+            return self.get_response(request)
@@ -0,0 +1,317 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Sum
+from django.core.handlers.base import BaseHandler
+from unittest import mock, skipUnless
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from bookings.models import Booking, BookingDailyRollup, BookingEvent
+from vehicles.models import Vehicle
+from . import sharding
+from .boot import measure_boot
+from .profiling import ProfilingMiddleware
+from .tracing import FileExporter, Trace
+
+
+class BootTimeTests(SimpleTestCase):
+    # Modules only needed once a profile is taken or a revocation hits Redis.
+    deferred_modules = ('cProfile', 'pstats', 'redis')
+
+    def test_api_profile_skips_admin_session_and_message_apps(self):
+        """Test that the API-only profile drops browser-facing apps and middleware"""
+        from . import settings_api
+
+        for app in settings_api.API_ONLY_EXCLUDED_APPS:
+            self.assertNotIn(app, settings_api.INSTALLED_APPS)
+        for middleware in settings_api.API_ONLY_EXCLUDED_MIDDLEWARE:
+            self.assertNotIn(middleware, settings_api.MIDDLEWARE)
+        self.assertIn('bookings', settings_api.INSTALLED_APPS)
+
+    def test_api_profile_defers_optional_modules(self):
+        """Test that booting an API worker leaves profiling and Redis modules unimported"""
+        code = (
+            'import sys, django; django.setup(); '
+            'from django.urls import get_resolver; get_resolver().url_patterns; '
+            f'print(sorted(m for m in {self.deferred_modules!r} if m in sys.modules))'
+        )
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'rental_backend.settings_api'}
+        output = subprocess.run(
+            [sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip(), '[]')
+
+    @skipUnless(os.environ.get('BOOT_IMPORT_BUDGET_MS'), 'set BOOT_IMPORT_BUDGET_MS to check boot import time')
+    def test_api_profile_import_time_within_budget(self):
+        """Test that an API worker boots within the import-time budget"""
+        budget_ms = float(os.environ['BOOT_IMPORT_BUDGET_MS'])
+        report = measure_boot('rental_backend.settings_api')
+        slowest = ', '.join(f'{name.strip()}={cumulative / 1000:.0f}ms' for name, _, cumulative in report['slowest'][:5])
+        self.assertLess(
+            report['import_ms'], budget_ms,
+            f"Boot imports took {report['import_ms']:.0f} ms (budget {budget_ms:.0f} ms); slowest: {slowest}"
+        )
+
+    def test_tracing_core_does_not_import_api_stack(self):
+        """Test that importing the span primitives leaves DRF renderers and simplejwt unloaded"""
+        code = (
+            'import sys, rental_backend.tracing; '
+            'print(sorted(m for m in ("rest_framework.renderers", "rest_framework_simplejwt.authentication") if m in sys.modules))'
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', code], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip(), '[]')
+
+
+class TracingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.vehicle = Vehicle.objects.create(owner=self.user, make='Toyota', model='Corolla', year=2020, plate='LHR-123')
+        self.access = str(RefreshToken.for_user(self.user).access_token)
+        self.trace_dir = tempfile.TemporaryDirectory()
+        self.trace_file = Path(self.trace_dir.name) / 'traces.jsonl'
+
+    def tearDown(self):
+        self.trace_dir.cleanup()
+
+    def _create_booking(self, **headers):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}', **headers)
+        start_date = date.today() + timedelta(days=1)
+        return client.post('/api/bookings/', {
+            'vehicle': self.vehicle.id,
+            'start_date': str(start_date),
+            'end_date': str(start_date + timedelta(days=1))
+        }, format='json')
+
+    def test_sampled_request_exports_spans(self):
+        """Test that a sampled booking create records auth, validation, ORM and render spans"""
+        trace_id = 'a' * 32
+        with override_settings(TRACING={
+            'SAMPLE_RATE': 0.0, 'TRUSTED_PROXIES': ['127.0.0.1'], 'EXPORTER': 'file', 'FILE_PATH': self.trace_file
+        }):
+            response = self._create_booking(HTTP_TRACEPARENT=f'00-{trace_id}-{"b" * 16}-01')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response['traceparent'].startswith(f'00-{trace_id}-'))
+
+        trace = json.loads(self.trace_file.read_text().splitlines()[0])
+        self.assertEqual(trace['trace_id'], trace_id)
+        names = {span['name'] for span in trace['spans']}
+        for name in ('http.request', 'auth.jwt', 'serializer.validate', 'booking.full_clean', 'db.query', 'render.json'):
+            self.assertIn(name, names)
+        root = next(span for span in trace['spans'] if span['name'] == 'http.request')
+        self.assertEqual(root['attributes']['http.status_code'], 201)
+
+    def test_unsampled_request_exports_nothing(self):
+        """Test that requests outside the sample are not exported"""
+        with override_settings(TRACING={'SAMPLE_RATE': 0.0, 'EXPORTER': 'file', 'FILE_PATH': self.trace_file}):
+            response = self._create_booking()
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('traceparent', response)
+        self.assertFalse(self.trace_file.exists())
+
+    def test_untrusted_traceparent_cannot_force_sampling(self):
+        """Test that a client's sampled traceparent is ignored unless it comes from a trusted proxy"""
+        with override_settings(TRACING={'SAMPLE_RATE': 0.0, 'EXPORTER': 'file', 'FILE_PATH': self.trace_file}):
+            response = self._create_booking(HTTP_TRACEPARENT=f'00-{"a" * 32}-{"b" * 16}-01')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('traceparent', response)
+        self.assertFalse(self.trace_file.exists())
+
+    def test_traces_are_rate_capped(self):
+        """Test that no more than MAX_TRACES_PER_SECOND requests are traced per second"""
+        with override_settings(TRACING={
+            'SAMPLE_RATE': 1.0, 'MAX_TRACES_PER_SECOND': 2, 'EXPORTER': 'file', 'FILE_PATH': self.trace_file
+        }), mock.patch('rental_backend.tracing.time.monotonic', return_value=100.0):
+            client = APIClient()
+            traced = ['traceparent' in client.get('/api/vehicles/') for _ in range(4)]
+        self.assertEqual(traced, [True, True, False, False])
+
+    def test_trace_file_is_rotated(self):
+        """Test that the trace file rotates past FILE_MAX_BYTES and keeps FILE_BACKUP_COUNT backups"""
+        exporter = FileExporter(self.trace_file, max_bytes=100, backup_count=2)
+        for index in range(5):
+            exporter.export(Trace(f'{index:032x}'))
+        backups = sorted(path.name for path in self.trace_file.parent.iterdir())
+        self.assertEqual(backups, ['traces.jsonl', 'traces.jsonl.1', 'traces.jsonl.2'])
+        self.assertLessEqual(self.trace_file.stat().st_size, 100)
+        self.assertIn(f'{4:032x}', self.trace_file.read_text())
+
+    def test_slow_query_log_records_call_site(self):
+        """Test that queries above the threshold are logged with SQL and call site"""
+        with override_settings(TRACING={'SAMPLE_RATE': 0.0, 'EXPORTER': None, 'SLOW_QUERY_MS': 0}), \
+                self.assertLogs('rental_backend.slow_queries', level='WARNING') as logs:
+            self._create_booking()
+        self.assertTrue(any('bookings/' in record.call_site for record in logs.records if record.call_site))
+        self.assertTrue(any('INSERT INTO "bookings_booking"' in record.sql for record in logs.records))
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.profile_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.profile_dir.cleanup()
+
+    def _client(self, user, **headers):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}', **headers)
+        return client
+
+    def _settings(self, **overrides):
+        return override_settings(PROFILING={'ENABLED': True, 'DIR': self.profile_dir.name, **overrides})
+
+    def test_staff_header_captures_downloadable_profile(self):
+        """Test that staff can profile a request and download the capture"""
+        with self._settings():
+            response = self._client(self.staff, HTTP_X_PROFILE='1').get('/api/bookings/')
+            self.assertEqual(response.status_code, 200)
+            profile_id = response['X-Profile-Id']
+            download = self._client(self.staff).get(f'/api/profiles/{profile_id}/?artifact=txt')
+        self.assertEqual(download.status_code, 200)
+        self.assertIn('GET /api/bookings/', b''.join(download.streaming_content).decode())
+        self.assertTrue((Path(self.profile_dir.name) / f'{profile_id}.prof').exists())
+
+    def test_non_staff_header_is_ignored(self):
+        """Test that regular users cannot trigger or download profiles"""
+        with self._settings():
+            response = self._client(self.user, HTTP_X_PROFILE='1').get('/api/bookings/')
+            self.assertNotIn('X-Profile-Id', response)
+            download = self._client(self.user).get('/api/profiles/20240101000000-deadbeef/')
+        self.assertEqual(download.status_code, 403)
+
+    def test_old_profiles_are_pruned(self):
+        """Test that only the newest MAX_PROFILES captures are kept"""
+        with self._settings(MAX_PROFILES=2):
+            client = self._client(self.staff, HTTP_X_PROFILE='1')
+            profile_ids = [client.get('/api/bookings/')['X-Profile-Id'] for _ in range(3)]
+        kept = sorted(path.name for path in Path(self.profile_dir.name).iterdir())
+        self.assertEqual(kept, sorted(f'{profile_id}.{artifact}' for profile_id in profile_ids[1:] for artifact in ('prof', 'txt')))
+
+    def middleware_chain(self):
+        handler = BaseHandler()
+        handler.load_middleware()
+        chain, current = [], getattr(handler._middleware_chain, '__wrapped__', handler._middleware_chain)
+        while hasattr(current, 'get_response'):
+            chain.append(type(current))
+            current = getattr(current.get_response, '__wrapped__', current.get_response)
+        return chain
+
+    def test_disabled_profiling_is_not_in_middleware_chain(self):
+        """Test that the profiling middleware is dropped from the built handler chain when disabled"""
+        with self._settings():
+            self.assertIn(ProfilingMiddleware, self.middleware_chain())
+        with override_settings(PROFILING={'ENABLED': False}):
+            self.assertNotIn(ProfilingMiddleware, self.middleware_chain())
+
+
+class CityShardingTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.renter = User.objects.create_user(username='renter', password='testpass123')
+        self.owner_client = APIClient()
+        self.owner_client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.owner).access_token}')
+        self.renter_client = APIClient()
+        self.renter_client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.renter).access_token}')
+        self.start = date.today() + timedelta(days=1)
+
+    def create_vehicle(self, plate, **headers):
+        response = self.owner_client.post(
+            '/api/vehicles/', {'make': 'Toyota', 'model': 'Corolla', 'year': 2020, 'plate': plate},
+            format='json', **headers
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def book(self, vehicle_id, **headers):
+        response = self.renter_client.post(
+            '/api/bookings/', {'vehicle': vehicle_id, 'start_date': str(self.start), 'end_date': str(self.start)},
+            format='json', **headers
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_city_rows_are_stored_on_the_city_shard(self):
+        """Test that vehicles, bookings and their events are written to the request city's shard"""
+        vehicle_id = self.create_vehicle('KHI-1', HTTP_X_CITY='karachi')
+        self.book(vehicle_id, HTTP_X_CITY='karachi')
+
+        self.assertEqual(Vehicle.objects.using('karachi').get().city, 'karachi')
+        booking = Booking.objects.using('karachi').get()
+        self.assertEqual((booking.city, booking.owner_id, booking.user_username), ('karachi', self.owner.pk, 'renter'))
+        self.assertEqual(BookingEvent.objects.using('karachi').count(), 1)
+        self.assertFalse(Vehicle.objects.using('default').exists())
+        self.assertFalse(Booking.objects.using('default').exists())
+
+        self.assertEqual(len(self.owner_client.get('/api/vehicles/').data), 0)
+        vehicles = self.owner_client.get('/api/vehicles/?city=karachi').data
+        self.assertEqual([(vehicle['plate'], vehicle['owner_username']) for vehicle in vehicles], [('KHI-1', 'owner')])
+
+    def test_history_fans_out_across_shards_in_parallel(self):
+        """Test that booking history merges every city's shard, querying shards in parallel threads"""
+        self.book(self.create_vehicle('LHR-1'))
+        self.book(self.create_vehicle('KHI-1', HTTP_X_CITY='karachi'), HTTP_X_CITY='karachi')
+        self.book(self.create_vehicle('ISB-1', HTTP_X_CITY='islamabad'), HTTP_X_CITY='islamabad')
+
+        with mock.patch.object(sharding, 'ThreadPoolExecutor', wraps=sharding.ThreadPoolExecutor) as executor:
+            response = self.renter_client.get('/api/bookings/history/')
+        self.assertEqual(executor.call_args.kwargs['max_workers'], 3)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(
+            {(item['city'], item['vehicle_details']['plate']) for item in response.data['results']},
+            {('lahore', 'LHR-1'), ('karachi', 'KHI-1'), ('islamabad', 'ISB-1')}
+        )
+
+    def test_report_sums_every_shard(self):
+        """Test that the booking report merges each city's rollups and labels rows with their city"""
+        self.book(self.create_vehicle('LHR-1'))
+        self.book(self.create_vehicle('KHI-1', HTTP_X_CITY='karachi'), HTTP_X_CITY='karachi')
+
+        response = self.owner_client.get('/api/bookings/report/')
+        self.assertEqual(response.data['totals']['bookings'], 2)
+        self.assertEqual({item['city'] for item in response.data['results']}, {'lahore', 'karachi'})
+
+    def test_plates_are_unique_across_cities(self):
+        """Test that a plate registered in one city can't be registered in another"""
+        vehicle_id = self.create_vehicle('LHR-1')
+        response = self.owner_client.post(
+            '/api/vehicles/', {'make': 'Honda', 'model': 'Civic', 'year': 2021, 'plate': 'lhr-1'},
+            format='json', HTTP_X_CITY='karachi'
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.owner_client.patch(f'/api/vehicles/{vehicle_id}/', {'plate': 'LHR-1'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_deleting_a_user_cleans_every_shard(self):
+        """Test that a user's vehicles, bookings and rollup counts go on every shard, not just default"""
+        self.book(self.create_vehicle('KHI-1', HTTP_X_CITY='karachi'), HTTP_X_CITY='karachi')
+        other_owner = User.objects.create_user(username='other', password='testpass123')
+        with sharding.use_city('islamabad'):
+            other_vehicle = Vehicle.objects.create(owner=other_owner, make='Honda', model='Civic', year=2021, plate='ISB-1')
+            Booking.objects.create(user=self.renter, vehicle=other_vehicle, start_date=self.start, end_date=self.start)
+
+        self.owner.delete()
+        self.assertFalse(Vehicle.objects.using('karachi').exists())
+        self.assertFalse(Booking.objects.using('karachi').exists())
+
+        self.renter.delete()
+        self.assertFalse(Booking.objects.using('islamabad').exists())
+        self.assertEqual(
+            BookingDailyRollup.objects.using('islamabad').aggregate(total=Sum('bookings'))['total'], 0
+        )
+
+    def test_unknown_city_is_rejected(self):
+        """Test that requests for an unconfigured city get a 400"""
+        response = self.owner_client.get('/api/vehicles/', HTTP_X_CITY='atlantis')
+        self.assertEqual(response.status_code, 400)
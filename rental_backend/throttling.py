@@ -0,0 +1,149 @@
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+from .idempotency import PROCESS_LOCAL_BACKENDS
+
+
+def check_throttle_cache():
+    alias = getattr(settings, 'THROTTLE_CACHE', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend is None:
+        raise ImproperlyConfigured(f"THROTTLE_CACHE refers to an unknown cache '{alias}'.")
+    if backend in PROCESS_LOCAL_BACKENDS:
+        raise ImproperlyConfigured(
+            f"THROTTLE_CACHE ('{alias}') uses {backend}, which is not shared between workers; "
+            "every worker would grant the full rate. Use a database, Redis or Memcached cache."
+        )
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """Sliding-window rate limit kept in a shared cache.
+
+    Rates use DRF's ``'<requests>/<period>'`` format. Each client gets a
+    counter per ``<period>`` window in ``THROTTLE_CACHE``, which must be
+    shared between workers (process-local caches are rejected at startup).
+    ``incr`` is atomic on Redis and Memcached; the database cache reads and
+    writes the row separately, so a burst of concurrent requests there may
+    overshoot the rate slightly. A request is allowed while the current window's count plus the previous
+    window's count, weighted by how much of it still overlaps the sliding
+    period, stays within ``<requests>``.
+    """
+    scope = None
+    cache_format = 'throttle_window_%(scope)s_%(ident)s'
+    timer = time.time
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+
+    def get_scope(self, request, view):
+        return self.scope
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    def get_rate(self, scope):
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[scope]
+        except KeyError:
+            return None
+
+    def parse_rate(self, rate):
+        num, period = rate.split('/')
+        duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+        return int(num), duration
+
+    def incr(self, key, timeout):
+        self.cache.add(key, 0, timeout)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Evicted between add and incr; start the window again.
+            self.cache.add(key, 1, timeout)
+            return 1
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(request, view)
+        rate = self.get_rate(self.scope) if self.scope else None
+        if rate is None:
+            return True
+
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        capacity, duration = self.parse_rate(rate)
+        now = self.timer()
+        window, elapsed = divmod(now, duration)
+        current_key = f'{key}_{int(window)}'
+        count = self.incr(current_key, duration * 2)
+        previous = self.cache.get(f'{key}_{int(window) - 1}', 0)
+        overlap = 1 - elapsed / duration
+        if previous * overlap + count <= capacity:
+            self._wait = None
+            return True
+
+        # Rejected requests don't use up the budget.
+        try:
+            self.cache.decr(current_key)
+        except ValueError:
+            pass
+        count -= 1
+        if count < capacity and previous:
+            # Wait until enough of the previous window has slid out.
+            needed_overlap = (capacity - 1 - count) / previous
+            self._wait = max(overlap - needed_overlap, 0) * duration
+        else:
+            self._wait = duration - elapsed
+        return False
+
+    def wait(self):
+        return getattr(self, '_wait', None)
+
+
+class UserWindowThrottle(SlidingWindowThrottle):
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': request.user.pk}
+
+
+class IPWindowThrottle(SlidingWindowThrottle):
+    scope = 'ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class EndpointWindowThrottle(SlidingWindowThrottle):
+    """Budget per endpoint for each client.
+
+    The scope is the view's ``throttle_scope`` if set, otherwise
+    ``'<basename>.<action>'`` for viewsets and the function name for
+    ``@api_view`` views. Clients are identified by user id when
+    authenticated and by IP otherwise, so one client exhausting ``login``
+    does not lock anyone else out. Endpoints without a configured rate are
+    not limited.
+    """
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope:
+            return scope
+        basename = getattr(view, 'basename', None)
+        action = getattr(view, 'action', None)
+        if basename and action:
+            return f'{basename}.{action}'
+        return type(view).__name__
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'user{request.user.pk}'
+        else:
+            ident = f'ip{self.get_ident(request)}'
+        return self.cache_format % {'scope': f'endpoint_{self.scope}', 'ident': ident}
@@ -0,0 +1,274 @@
+"""Minimal request tracing with OpenTelemetry-style spans.
+
+A trace is started per request by ``TracingMiddleware`` when the request is
+sampled (``TRACING['SAMPLE_RATE']``, or an incoming W3C ``traceparent`` with
+the sampled flag from a trusted proxy), up to ``MAX_TRACES_PER_SECOND`` per
+worker. Code opens child spans with ``span('name')``; when no
+trace is active this returns a shared no-op context, so unsampled requests
+pay almost nothing. Finished traces go to the configured exporter as one
+JSON object per trace.
+
+This module only depends on Django core so models can open spans without
+importing the API stack; the DRF adapters live in ``rental_backend.api_tracing``.
+"""
+import contextvars
+import json
+import logging
+import random
+import secrets
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from django.conf import settings
+from django.db import connections
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 0.0,
+    'TRUST_TRACEPARENT': False,
+    'TRUSTED_PROXIES': (),
+    'MAX_TRACES_PER_SECOND': 10,
+    'EXPORTER': 'console',
+    'FILE_PATH': 'traces.jsonl',
+    'FILE_MAX_BYTES': 50 * 1024 * 1024,
+    'FILE_BACKUP_COUNT': 3,
+    'SLOW_QUERY_MS': 200,
+}
+
+slow_query_logger = logging.getLogger('rental_backend.slow_queries')
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+def tracing_settings():
+    return {**DEFAULTS, **getattr(settings, 'TRACING', {})}
+
+
+class Span:
+    def __init__(self, trace, name, parent_id=None, attributes=None):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = None
+        self._token = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        if exc_type is not None:
+            self.attributes['error'] = exc_type.__name__
+        _current_span.reset(self._token)
+        self.trace.spans.append(self)
+        return False
+
+    def as_dict(self):
+        return {
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': round(self.duration_ms, 3),
+            'attributes': self.attributes,
+        }
+
+
+class Trace:
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.spans = []
+
+    def as_dict(self):
+        return {'trace_id': self.trace_id, 'spans': [span.as_dict() for span in self.spans]}
+
+
+class _NoopSpan:
+    def set_attribute(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def current_span():
+    return _current_span.get()
+
+
+def span(name, **attributes):
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(parent.trace, name, parent_id=parent.span_id, attributes=attributes)
+
+
+class ConsoleExporter:
+    def export(self, trace):
+        sys.stderr.write(json.dumps(trace.as_dict()) + '\n')
+
+
+class FileExporter:
+    """Appends traces to ``path``, rotating it to ``path.1`` .. ``path.<backup_count>`` past ``max_bytes``."""
+
+    def __init__(self, path, max_bytes=None, backup_count=0):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.lock = threading.Lock()
+
+    def backup(self, index):
+        return self.path.with_name(f'{self.path.name}.{index}')
+
+    def rotate(self):
+        for index in range(self.backup_count - 1, 0, -1):
+            if self.backup(index).exists():
+                self.backup(index).replace(self.backup(index + 1))
+        if self.backup_count:
+            self.path.replace(self.backup(1))
+        else:
+            self.path.unlink()
+
+    def export(self, trace):
+        line = json.dumps(trace.as_dict()) + '\n'
+        with self.lock:
+            if self.max_bytes and self.path.exists() and self.path.stat().st_size + len(line) > self.max_bytes:
+                self.rotate()
+            with self.path.open('a') as f:
+                f.write(line)
+
+
+def get_exporter(config):
+    if config['EXPORTER'] == 'console':
+        return ConsoleExporter()
+    if config['EXPORTER'] == 'file':
+        return FileExporter(config['FILE_PATH'], config['FILE_MAX_BYTES'], config['FILE_BACKUP_COUNT'])
+    return None
+
+
+class TraceRateLimiter:
+    """Allows at most ``per_second`` traces in each wall-clock second; ``None`` means no cap."""
+
+    def __init__(self, per_second):
+        self.per_second = per_second
+        self.lock = threading.Lock()
+        self.second = None
+        self.count = 0
+
+    def allow(self):
+        if self.per_second is None:
+            return True
+        now = int(time.monotonic())
+        with self.lock:
+            if now != self.second:
+                self.second, self.count = now, 0
+            if self.count >= self.per_second:
+                return False
+            self.count += 1
+            return True
+
+
+def parse_traceparent(header):
+    parts = (header or '').split('-')
+    if len(parts) != 4 or len(parts[1]) != 32:
+        return None, False
+    try:
+        return parts[1], bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None, False
+
+
+def call_site():
+    """The innermost stack frame that belongs to this project, as ``file:line in function``."""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        if frame.filename.startswith(base_dir) and 'site-packages' not in frame.filename \
+                and not frame.filename.endswith('tracing.py'):
+            return f'{Path(frame.filename).relative_to(base_dir)}:{frame.lineno} in {frame.name}'
+    return None
+
+
+class QueryObserver:
+    """``connection.execute_wrapper`` hook: one span per query plus the slow-query log."""
+
+    def __init__(self, slow_query_ms):
+        self.slow_query_ms = slow_query_ms
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        with span('db.query', **{'db.system': context['connection'].vendor, 'db.statement': sql}) as query_span:
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                duration_ms = (time.perf_counter() - started) * 1000
+                if self.slow_query_ms is not None and duration_ms >= self.slow_query_ms:
+                    site = call_site()
+                    query_span.set_attribute('db.slow', True)
+                    slow_query_logger.warning(
+                        'Slow query (%.1f ms) at %s: %s', duration_ms, site, sql,
+                        extra={'duration_ms': duration_ms, 'sql': sql, 'call_site': site}
+                    )
+
+
+class TracingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = tracing_settings()
+        self.exporter = get_exporter(self.config)
+        self.limiter = TraceRateLimiter(self.config['MAX_TRACES_PER_SECOND'])
+
+    def trusts_traceparent(self, request):
+        return self.config['TRUST_TRACEPARENT'] or request.META.get('REMOTE_ADDR') in self.config['TRUSTED_PROXIES']
+
+    def is_sampled(self, request):
+        """Return ``(trace_id, sampled)``.
+
+        An incoming ``traceparent`` keeps its trace id, but its sampled flag is
+        only honoured from trusted callers; otherwise any client could force
+        every request to be traced. All sampled requests count against the
+        per-worker rate cap.
+        """
+        trace_id, sampled = parse_traceparent(request.headers.get('traceparent'))
+        if not (trace_id and self.trusts_traceparent(request)):
+            sampled = random.random() < self.config['SAMPLE_RATE']
+        return trace_id, sampled and self.limiter.allow()
+
+    def __call__(self, request):
+        if not self.config['ENABLED']:
+            return self.get_response(request)
+
+        trace_id, sampled = self.is_sampled(request)
+        observer = QueryObserver(self.config['SLOW_QUERY_MS'])
+        wrappers = [connection.execute_wrapper(observer) for connection in connections.all()]
+        for wrapper in wrappers:
+            wrapper.__enter__()
+        try:
+            if not sampled:
+                return self.get_response(request)
+            trace = Trace(trace_id)
+            with Span(trace, 'http.request', attributes={'http.method': request.method, 'http.path': request.path}) as root:
+                response = self.get_response(request)
+                root.set_attribute('http.status_code', response.status_code)
+            response['traceparent'] = f'00-{trace.trace_id}-{root.span_id}-01'
+            if self.exporter is not None:
+                self.exporter.export(trace)
+            return response
+        finally:
+            for wrapper in reversed(wrappers):
+                wrapper.__exit__(None, None, None)
+
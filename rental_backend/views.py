@@ -1,6 +1,7 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from .sharding import sharding_settings
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -8,10 +9,12 @@ def api_root(request):
     return Response({
         'message': 'Lahore Car Rental Backend API',
         'version': '1.0',
+        'cities': list(sharding_settings()['CITIES']),
         'endpoints': {
             'authentication': {
                 'register': '/api/register',
                 'login': '/api/login',
+                'logout': '/api/logout',
                 'refresh_token': '/api/token/refresh/'
             },
             'vehicles': '/api/vehicles/',
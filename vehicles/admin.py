@@ -1,10 +1,15 @@
 from django.contrib import admin
+from rental_backend.pagination import EstimatedCountPaginator
 from .models import Vehicle
 
 
 @admin.register(Vehicle)
 class VehicleAdmin(admin.ModelAdmin):
-    list_display = ('plate', 'make', 'model', 'year', 'owner', 'created_at')
+    list_display = ('plate', 'make', 'model', 'year', 'owner__username', 'created_at')
     list_filter = ('make', 'year', 'created_at')
-    search_fields = ('plate', 'make', 'model', 'owner__username')
+    list_select_related = ('owner',)
+    search_fields = ('^plate', '^make', '^model', '^owner__username')
+    autocomplete_fields = ('owner',)
     readonly_fields = ('created_at', 'updated_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['make', 'model'], name='vehicle_make_model_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['model'], name='vehicle_model_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:41
+
+import django.db.models.deletion
+import rental_backend.sharding
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0002_admin_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='city',
+            field=models.CharField(default=rental_backend.sharding.current_city, editable=False, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='vehicle',
+            name='owner',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='vehicles', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+# Admin search uses ^field prefixes, i.e. istartswith. PostgreSQL compiles
+# that to UPPER(col::text) LIKE 'X%', which only an UPPER() expression index
+# with text_pattern_ops can serve; SQLite's case-insensitive LIKE needs a
+# NOCASE index. Other backends keep the plain indexes from 0002.
+PREFIX_SEARCH_INDEXES = (
+    ('vehicles_vehicle', 'plate', 'vehicle_plate_prefix_idx'),
+    ('vehicles_vehicle', 'make', 'vehicle_make_prefix_idx'),
+    ('vehicles_vehicle', 'model', 'vehicle_model_prefix_idx'),
+    ('auth_user', 'username', 'auth_user_username_prefix_idx'),
+)
+
+
+def create_prefix_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    quote = schema_editor.quote_name
+    for table, column, name in PREFIX_SEARCH_INDEXES:
+        if vendor == 'postgresql':
+            expression = f'UPPER({quote(column)}::text) text_pattern_ops'
+        elif vendor == 'sqlite':
+            expression = f'{quote(column)} COLLATE NOCASE'
+        else:
+            continue
+        schema_editor.execute(f'CREATE INDEX {quote(name)} ON {quote(table)} ({expression})')
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor not in ('postgresql', 'sqlite'):
+        return
+    for _, _, name in PREFIX_SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0003_vehicle_city'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
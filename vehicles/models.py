@@ -1,9 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import User
+from rental_backend.sharding import current_city
 
 
 class Vehicle(models.Model):
-    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='vehicles')
+    # Users live on the default database, so cross-shard user references carry no constraint.
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='vehicles', db_constraint=False)
+    city = models.CharField(max_length=50, default=current_city, editable=False)
     make = models.CharField(max_length=100)
     model = models.CharField(max_length=100)
     year = models.PositiveIntegerField()
@@ -15,6 +18,36 @@ class Vehicle(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Vehicle'
         verbose_name_plural = 'Vehicles'
+        indexes = [
+            models.Index(fields=['make', 'model'], name='vehicle_make_model_idx'),
+            models.Index(fields=['model'], name='vehicle_model_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        vehicle = super().from_db(db, field_names, values)
+        vehicle._loaded_values = dict(zip(field_names, values))
+        return vehicle
+
+    def changed_fields(self, attnames):
+        """The subset of ``attnames`` that differs from the row as loaded (all of them if it wasn't loaded)."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return set(attnames)
+        return {name for name in attnames if name not in loaded or loaded[name] != getattr(self, name)}
+
+    def saved_attnames(self, update_fields=None):
+        """Column attnames a save with ``update_fields`` writes."""
+        return {
+            field.attname for field in self._meta.concrete_fields
+            if update_fields is None or field.name in update_fields or field.attname in update_fields
+        }
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if hasattr(self, '_loaded_values'):
+            for attname in self.saved_attnames(kwargs.get('update_fields')):
+                self._loaded_values[attname] = getattr(self, attname)
 
     def __str__(self):
         return f"{self.year} {self.make} {self.model} - {self.plate}"
@@ -1,15 +1,36 @@
 from rest_framework import serializers
+from rental_backend.api_tracing import TracedValidationMixin
+from rental_backend.sharding import current_shard, fan_out
 from .models import Vehicle
 
 
-class VehicleSerializer(serializers.ModelSerializer):
-    owner_username = serializers.CharField(source='owner.username', read_only=True)
+class VehicleSerializer(TracedValidationMixin, serializers.ModelSerializer):
+    owner_username = serializers.SerializerMethodField()
 
     class Meta:
         model = Vehicle
-        fields = ('id', 'owner', 'owner_username', 'make', 'model', 'year', 'plate', 'created_at', 'updated_at')
-        read_only_fields = ('owner', 'created_at', 'updated_at')
+        fields = ('id', 'owner', 'owner_username', 'city', 'make', 'model', 'year', 'plate', 'created_at', 'updated_at')
+        read_only_fields = ('owner', 'city', 'created_at', 'updated_at')
+
+    def get_owner_username(self, obj):
+        # Owners live on the default database, apart from city-sharded vehicles.
+        request = self.context.get('request')
+        if request is not None and request.user.pk == obj.owner_id:
+            return request.user.username
+        return obj.owner.username
 
     def validate_plate(self, value):
-        return value.upper().strip()
+        plate = value.upper().strip()
+        instance = self.instance
+
+        def taken():
+            # The unique constraint only covers one shard, so look on all of them.
+            vehicles = Vehicle.objects.filter(plate=plate)
+            if instance is not None and instance._state.db == current_shard():
+                vehicles = vehicles.exclude(pk=instance.pk)
+            return vehicles.exists()
+
+        if any(fan_out(taken).values()):
+            raise serializers.ValidationError('vehicle with this plate already exists.')
+        return plate
 
@@ -1,4 +1,8 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -7,13 +11,27 @@ from .models import Vehicle
 
 
 class VehicleTests(TestCase):
+    databases = '__all__'
+
     def setUp(self):
+        caches[settings.THROTTLE_CACHE].clear()
         self.client = APIClient()
         self.user = User.objects.create_user(username='testuser', password='testpass123')
         self.token = RefreshToken.for_user(self.user)
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token.access_token}')
         self.vehicles_url = '/api/vehicles/'
 
+    def test_create_vehicle_with_idempotency_key(self):
+        """Test that retrying a vehicle create with the same Idempotency-Key creates it once"""
+        data = {'make': 'Toyota', 'model': 'Corolla', 'year': 2020, 'plate': 'LHR-123'}
+        first = self.client.post(self.vehicles_url, data, format='json', HTTP_IDEMPOTENCY_KEY='vehicle-1')
+        retry = self.client.post(self.vehicles_url, data, format='json', HTTP_IDEMPOTENCY_KEY='vehicle-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(Vehicle.objects.count(), 1)
+
     def test_create_vehicle(self):
         """Test creating a new vehicle"""
         data = {
@@ -95,3 +113,25 @@ class VehicleTests(TestCase):
         }
         response = self.client.post(self.vehicles_url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_checks_ownership_in_vehicle_query(self):
+        """Test that retrieve loads an owned vehicle in one query and 404s on other owners' vehicles"""
+        vehicle = Vehicle.objects.create(owner=self.user, make='Toyota', model='Corolla', year=2020, plate='LHR-123')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'{self.vehicles_url}{vehicle.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['owner_username'], 'testuser')
+        # One query to authenticate the user, one to load the vehicle (throttle-cache traffic aside)
+        queries = [q for q in ctx.captured_queries if q['sql'].startswith('SELECT') and 'throttle_cache' not in q['sql']]
+        self.assertEqual(len(queries), 2)
+
+        vehicle.owner = User.objects.create_user(username='otheruser', password='pass123')
+        vehicle.save()
+        self.assertEqual(self.client.get(f'{self.vehicles_url}{vehicle.id}/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_admin_prefix_search_uses_indexes(self):
+        """Test that the admin's ^ (istartswith) searches are served by the prefix indexes"""
+        for field, index in (('plate', 'vehicle_plate_prefix_idx'), ('make', 'vehicle_make_prefix_idx'),
+                             ('model', 'vehicle_model_prefix_idx')):
+            self.assertIn(index, Vehicle.objects.filter(**{f'{field}__istartswith': 'lhr'}).explain())
+        self.assertIn('auth_user_username_prefix_idx', User.objects.filter(username__istartswith='test').explain())
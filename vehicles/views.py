@@ -1,17 +1,29 @@
+from django.http import Http404
 from rest_framework import status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rental_backend.idempotency import IdempotentCreateMixin
 from .models import Vehicle
 from .serializers import VehicleSerializer
 
 
-class VehicleViewSet(viewsets.ModelViewSet):
+class VehicleViewSet(IdempotentCreateMixin, viewsets.ModelViewSet):
     serializer_class = VehicleSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         return Vehicle.objects.filter(owner=self.request.user)
 
+    def get_object(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            vehicle = Vehicle.objects.filter(owner=self.request.user).get(pk=self.kwargs[lookup_url_kwarg])
+        except (Vehicle.DoesNotExist, ValueError):
+            raise Http404
+        vehicle.owner = self.request.user
+        self.check_object_permissions(self.request, vehicle)
+        return vehicle
+
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 